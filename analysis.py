@@ -0,0 +1,82 @@
+import importlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+
+from cache import cache_key, result_cache
+from diagnostics import stage
+from noss import AnalysisResult, parse_noss, score_document
+from taxonomy import taxonomies
+
+# PDF builds run off the request path; one build per content even across sessions
+_pdf_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="pdf-build")
+_pdf_jobs = {}
+_pdf_lock = threading.Lock()
+
+# Heavy imports deferred until a document is parsed or a PDF is built
+LAZY_MODULES = ("bs4", "report")
+
+
+def analyze(html_bytes, cache=result_cache, backend=None, pdf=True, diagnostics=None, taxonomy=None):
+    # Results are cached per taxonomy version, so editing a taxonomy file only
+    # invalidates the results computed with it
+    taxonomy = taxonomies.get(taxonomy)
+    with stage(diagnostics, "hash"):
+        key = cache_key(html_bytes, taxonomy.version)
+    computed = False
+
+    def compute():
+        nonlocal computed
+        computed = True
+        with stage(diagnostics, "decode"):
+            html = html_bytes.decode("utf-8")
+        with stage(diagnostics, "parse"):
+            document = parse_noss(html, backend)
+        with stage(diagnostics, "score"):
+            scores = score_document(document, taxonomy)
+        return AnalysisResult(document, scores, key=key)
+
+    result = compute() if cache is None else cache.get_or_compute(key, compute)
+    if diagnostics is not None:
+        diagnostics.cached = not computed
+    if pdf:
+        ensure_pdf(result, cache, diagnostics)
+    return result
+
+
+def preload():
+    # Import the deferred modules ahead of time, e.g. in a background thread after startup
+    for name in LAZY_MODULES:
+        importlib.import_module(name)
+
+
+def ensure_pdf(result, cache=result_cache, diagnostics=None):
+    if not result.pdf:
+        from report import build_pdf_report
+
+        output = BytesIO()
+        with stage(diagnostics, "build_pdf"):
+            build_pdf_report(result.document, result.scores, output)
+        result.pdf = output.getvalue()
+        if cache is not None:
+            cache.put(result.key, result)
+    return result.pdf
+
+
+def request_pdf(result, cache=result_cache, diagnostics=None):
+    if result.pdf:
+        future = Future()
+        future.set_result(result.pdf)
+        return future
+    with _pdf_lock:
+        future = _pdf_jobs.get(result.key)
+        if future is None:
+            future = _pdf_pool.submit(ensure_pdf, result, cache, diagnostics)
+            _pdf_jobs[result.key] = future
+            future.add_done_callback(lambda _: _forget_pdf_job(result.key))
+    return future
+
+
+def _forget_pdf_job(key):
+    with _pdf_lock:
+        _pdf_jobs.pop(key, None)
@@ -0,0 +1,225 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+
+from analysis import analyze
+from cu_index import CuIndex
+from taxonomy import taxonomies
+
+HTML_SUFFIXES = (".html", ".htm")
+SUMMARY_COLUMNS = ["file", "noss_code", "noss_title", "cu_index", "cu_code", "cu_title"]
+
+
+def summary_columns(taxonomy=None):
+    # One "<code>_total" column per taxonomy category, e.g. gt_total, ir_total
+    return SUMMARY_COLUMNS + [f"{code.lower()}_total" for code in taxonomies.get(taxonomy).codes]
+
+
+@dataclass(slots=True)
+class FileResult:
+    name: str
+    rows: list = field(default_factory=list)
+    pdf_path: str = ""
+    error: str = ""
+    seconds: float = 0.0
+    analysis: object = None
+
+
+# === Sources ===
+def collect_sources(source):
+    # (display name, directory or zip path, member) for every NOSS file in source
+    source = Path(source)
+    if source.is_dir():
+        return [
+            (path.relative_to(source).as_posix(), str(source), path.relative_to(source).as_posix())
+            for path in sorted(source.rglob("*"))
+            if path.is_file() and path.suffix.lower() in HTML_SUFFIXES
+        ]
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            return [
+                (info.filename, str(source), info.filename)
+                for info in archive.infolist()
+                if not info.is_dir() and Path(info.filename).suffix.lower() in HTML_SUFFIXES
+            ]
+    if source.is_file():
+        return [(source.name, str(source.parent), source.name)]
+    raise FileNotFoundError(f"No such directory, zip archive or file: {source}")
+
+
+def _read_source(container, member):
+    if os.path.isdir(container):
+        return (Path(container) / member).read_bytes()
+    with zipfile.ZipFile(container) as archive:
+        return archive.read(member)
+
+
+# === Worker ===
+def _pdf_path(output_dir, name):
+    # Zip member names may be absolute or climb out of the output directory
+    parts = [part for part in PurePosixPath(name).parts if part not in ("/", "..")]
+    return Path(output_dir, *parts).with_suffix(".pdf")
+
+
+def process_file(name, container, member, output_dir=None, backend=None, keep_analysis=False, taxonomy=None):
+    start = time.perf_counter()
+    result = FileResult(name)
+    try:
+        analysis = analyze(
+            _read_source(container, member), cache=None, backend=backend, pdf=bool(output_dir), taxonomy=taxonomy
+        )
+        profile = analysis.document.profile_data
+        for i, (cu, cu_score) in enumerate(zip(analysis.document.cu_blocks, analysis.scores.cu_scores), 1):
+            result.rows.append({
+                "file": name,
+                "noss_code": profile.get("NOSS CODE", ""),
+                "noss_title": profile.get("NOSS TITLE", ""),
+                "cu_index": i,
+                "cu_code": cu.code,
+                "cu_title": cu.title,
+                **{f"{code.lower()}_total": total for code, total in cu_score.totals.items()},
+            })
+        if output_dir:
+            pdf_path = _pdf_path(output_dir, name)
+            pdf_path.parent.mkdir(parents=True, exist_ok=True)
+            pdf_path.write_bytes(analysis.pdf)
+            result.pdf_path = str(pdf_path)
+        if keep_analysis:
+            analysis.pdf = b""
+            result.analysis = analysis
+    except Exception as exc:
+        result.error = f"{type(exc).__name__}: {exc}"
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+# === Batch ===
+def run_batch(
+    source, output_dir, workers=None, formats=("csv", "json"), pdf=True, backend=None, progress=None, index=None,
+    taxonomy=None,
+):
+    # taxonomy is a name or path (not a Taxonomy) so workers load their own copy
+    sources = collect_sources(source)
+    os.makedirs(output_dir, exist_ok=True)
+    pdf_dir = output_dir if pdf else None
+    keep = index is not None
+    if keep:
+        # Results come back from the workers; the index looks their taxonomy up by version
+        taxonomies.get(taxonomy)
+    results = []
+
+    def report(result):
+        if result.analysis is not None:
+            index.add(result.name, result.analysis)
+            result.analysis = None
+        results.append(result)
+        if progress:
+            progress(len(results), len(sources), result)
+
+    jobs = [(name, container, member, pdf_dir, backend, keep, taxonomy) for name, container, member in sources]
+    if workers == 1:
+        for job in jobs:
+            report(process_file(*job))
+    else:
+        _run_parallel(jobs, workers or os.cpu_count() or 1, report)
+
+    results.sort(key=lambda r: r.name)
+    write_summary(results, output_dir, formats, taxonomy)
+    return results
+
+
+def _failed(job, exc):
+    return FileResult(job[0], error=f"{type(exc).__name__}: {exc}")
+
+
+def _run_parallel(jobs, workers, report):
+    # At most `workers` files are in flight, so a worker that dies (OOM kill,
+    # native crash) only breaks the pool for the files running beside it.
+    # Those are rerun one process each to find the file that crashed; the
+    # rest of the batch continues in a fresh pool.
+    pending = deque(jobs)
+    while pending:
+        suspects = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            running = {}
+            while running or (pending and not suspects):
+                while pending and not suspects and len(running) < workers:
+                    job = pending.popleft()
+                    running[pool.submit(process_file, *job)] = job
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    try:
+                        report(future.result())
+                    except BrokenProcessPool:
+                        suspects.append(job)
+                    except Exception as exc:
+                        report(_failed(job, exc))
+        for job in suspects:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                try:
+                    report(pool.submit(process_file, *job).result())
+                except Exception as exc:
+                    report(_failed(job, exc))
+
+
+def write_summary(results, output_dir, formats=("csv", "json"), taxonomy=None):
+    if "csv" in formats:
+        with open(os.path.join(output_dir, "summary.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=summary_columns(taxonomy))
+            writer.writeheader()
+            for result in results:
+                writer.writerows(result.rows)
+    if "json" in formats:
+        summary = [
+            {"file": r.name, "pdf": r.pdf_path, "error": r.error, "seconds": round(r.seconds, 3), "cus": r.rows}
+            for r in results
+        ]
+        with open(os.path.join(output_dir, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+
+
+def _print_progress(done, total, result):
+    status = f"error ({result.error})" if result.error else f"{len(result.rows)} CUs"
+    print(f"[{done}/{total}] {result.name}: {status} in {result.seconds:.2f}s", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze a directory or zip archive of NOSS HTML files.")
+    parser.add_argument("source", help="directory, .zip archive or single .html file")
+    parser.add_argument("-o", "--output", default="cu-analyzer-output", help="output directory (default: %(default)s)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--format", choices=["csv", "json", "both"], default="both", help="summary format")
+    parser.add_argument("--no-pdf", action="store_true", help="skip per-file PDF reports")
+    parser.add_argument("--parser", choices=["soup", "stream"], default=None, help="HTML parser backend")
+    parser.add_argument("--index", metavar="PATH", help="also add every analyzed file to this search index")
+    parser.add_argument("--taxonomy", metavar="NAME_OR_PATH", help="keyword taxonomy (default: %(default)s)",
+                        default=taxonomies.default_name)
+    args = parser.parse_args(argv)
+
+    formats = ("csv", "json") if args.format == "both" else (args.format,)
+    start = time.perf_counter()
+    results = run_batch(
+        args.source, args.output, workers=args.workers, formats=formats,
+        pdf=not args.no_pdf, backend=args.parser, progress=_print_progress,
+        index=CuIndex(args.index) if args.index else None, taxonomy=args.taxonomy,
+    )
+    failed = sum(1 for r in results if r.error)
+    print(
+        f"Processed {len(results)} files ({failed} failed) in {time.perf_counter() - start:.1f}s -> {args.output}",
+        file=sys.stderr,
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
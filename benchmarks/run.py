@@ -0,0 +1,163 @@
+"""Stage-by-stage timing of the NOSS pipeline on synthetic documents.
+
+    python -m benchmarks.run --cus 10 50 100 200 --save benchmarks/baseline.json
+    python -m benchmarks.run --cus 10 50 100 200 --compare benchmarks/baseline.json
+
+Each stage is timed separately (median of --repeat runs) and then run once
+more under tracemalloc for its peak allocation (skip with --no-memory). --compare exits non-zero
+when a stage is slower than the baseline by more than --tolerance.
+"""
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from io import BytesIO
+
+from benchmarks.synthetic import generate_noss
+from noss import parse_noss, score_document
+from report import build_pdf_report, highlight_keywords, process_html_to_pdf
+from taxonomy import taxonomies
+from web import display_web_report, highlight, highlight_items, process_html_and_display_web
+
+STAGES = [
+    "parse_soup", "parse_stream", "score_baseline", "score", "highlight_html", "highlight_pdf",
+    "render_web", "build_pdf", "process_html_to_pdf", "process_html_and_display_web",
+]
+
+# The web stages call Streamlit outside a running app, which warns on every element
+logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").disabled = True
+
+
+def _score_baseline(document):
+    # The original app's scoring: a substring test per keyword for the totals, then
+    # again per field with str.count for the keyword tallies
+    taxonomy = taxonomies.get()
+    weights = taxonomy.weights
+    keywords = {code: category.keywords for code, category in taxonomy.categories.items()}
+    counts = {code: Counter() for code in keywords}
+    for cu in document.cu_blocks:
+        for kws in keywords.values():
+            sum(weights[k] if any(kw in cu.get(k, "").lower() for kw in kws) else 0 for k in weights)
+        for k in weights:
+            text = cu.get(k, "").lower()
+            for code, kws in keywords.items():
+                any(kw in text for kw in kws)
+                for kw in kws:
+                    counts[code][kw] += text.count(kw)
+    return counts
+
+
+def _highlight_html(scores):
+    for cu_score in scores.cu_scores:
+        matches = cu_score.matches
+        highlight(matches["CU TITLE"])
+        highlight(matches["CU DESCRIPTOR"])
+        highlight_items(matches["WORK ACTIVITY"])
+        highlight_items(matches["PERFORMANCE CRITERIA"])
+
+
+def _highlight_pdf(scores):
+    for cu_score in scores.cu_scores:
+        for match in cu_score.matches.values():
+            highlight_keywords(match)
+
+
+def stage_callables(html):
+    document = parse_noss(html)
+    scores = score_document(document)
+    return {
+        "parse_soup": lambda: parse_noss(html, "soup"),
+        "parse_stream": lambda: parse_noss(html, "stream"),
+        "score_baseline": lambda: _score_baseline(document),
+        "score": lambda: score_document(document),
+        "highlight_html": lambda: _highlight_html(scores),
+        "highlight_pdf": lambda: _highlight_pdf(scores),
+        "render_web": lambda: display_web_report(document, scores),
+        "build_pdf": lambda: build_pdf_report(document, scores, BytesIO()),
+        "process_html_to_pdf": lambda: process_html_to_pdf(html, BytesIO()),
+        "process_html_and_display_web": lambda: process_html_and_display_web(html),
+    }
+
+
+def measure(fn, repeat, memory=True):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    if not memory:
+        return statistics.median(times), 0
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(times), peak
+
+
+def run(sizes, words, density, repeat, stages, memory=True):
+    results = []
+    for n_cus in sizes:
+        html = generate_noss(n_cus=n_cus, words=words, keyword_density=density, seed=n_cus)
+        fns = stage_callables(html)
+        for stage in stages:
+            seconds, peak = measure(fns[stage], repeat, memory)
+            results.append({"cus": n_cus, "html_bytes": len(html), "stage": stage, "seconds": seconds, "peak_bytes": peak})
+            print(
+                f"{n_cus:>5} CUs  {stage:<30} {seconds * 1000:>10.1f} ms"
+                f"  {seconds * 1000 / max(n_cus, 1):>8.2f} ms/CU  {peak / 1e6:>8.1f} MB peak",
+                flush=True,
+            )
+    return results
+
+
+def compare(results, baseline, tolerance):
+    previous = {(r["cus"], r["stage"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        base = previous.get((r["cus"], r["stage"]))
+        if not base:
+            continue
+        ratio = r["seconds"] / base["seconds"] if base["seconds"] else 1.0
+        if ratio > 1 + tolerance:
+            regressions.append((r["cus"], r["stage"], base["seconds"], r["seconds"], ratio))
+    for n_cus, stage, before, after, ratio in regressions:
+        print(f"REGRESSION {n_cus} CUs {stage}: {before * 1000:.1f} ms -> {after * 1000:.1f} ms ({ratio:.2f}x)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the NOSS parse/score/highlight/PDF stages.")
+    parser.add_argument("--cus", type=int, nargs="+", default=[10, 50, 100, 200], help="CU counts to generate")
+    parser.add_argument("--words", type=int, default=25, help="words per generated sentence")
+    parser.add_argument("--density", type=float, default=0.05, help="probability that a word is a keyword")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage (median is reported)")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--no-memory", action="store_true", help="skip the (slow) tracemalloc pass")
+    parser.add_argument("--save", metavar="PATH", help="write results as JSON (e.g. a new baseline)")
+    parser.add_argument("--compare", metavar="PATH", help="baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before failing")
+    args = parser.parse_args(argv)
+
+    results = run(args.cus, args.words, args.density, args.repeat, args.stages, not args.no_memory)
+    if args.save:
+        meta = {
+            "python": platform.python_version(), "platform": platform.platform(),
+            "words": args.words, "density": args.density, "repeat": args.repeat,
+        }
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+import random
+from html import escape
+
+from taxonomy import taxonomies
+
+FILLER = (
+    "the operator shall ensure process quality and safety of plant equipment according to standard "
+    "operating procedures with complete records checklist tools materials inspection maintenance "
+    "supervisor team schedule report verify identify prepare carry out monitor document"
+).split()
+
+PROFILE = {
+    "SECTION": "(C) MANUFACTURING",
+    "GROUP": "(28) MANUFACTURE OF MACHINERY AND EQUIPMENT",
+    "AREA": "PLANT OPERATION",
+    "NOSS CODE": "MC-030-3:2024",
+    "NOSS TITLE": "SYNTHETIC PLANT OPERATIONS",
+    "NOSS LEVEL": "THREE (3)",
+}
+
+
+def _sentence(rng, words, keyword_density, keywords):
+    out = []
+    for _ in range(words):
+        if rng.random() < keyword_density:
+            kw = rng.choice(keywords)
+            out.append(kw.title() if rng.random() < 0.3 else kw)
+        else:
+            out.append(rng.choice(FILLER))
+    return " ".join(out)
+
+
+def _row(label, value):
+    return f"<tr><td>{escape(label)}</td><td>{value}</td></tr>"
+
+
+def generate_noss(n_cus=20, words=25, keyword_density=0.05, activities=4, criteria=3, seed=0, taxonomy=None):
+    # NOSS export layout: profile table, then per CU a CU CODE/TITLE/DESCRIPTOR
+    # table followed by a WORK ACTIVITIES/PERFORMANCE CRITERIA table
+    rng = random.Random(seed)
+    keywords = [kw for category in taxonomies.get(taxonomy).categories.values() for kw in category.keywords]
+
+    def text(n):
+        return escape(_sentence(rng, n, keyword_density, keywords))
+
+    parts = ["<!DOCTYPE html><html><head><title>NOSS</title></head><body>"]
+    parts.append('<table class="table table-bordered">')
+    parts += [_row(k, escape(v)) for k, v in PROFILE.items()]
+    parts.append("</table>")
+    for i in range(1, n_cus + 1):
+        parts.append('<table class="table table-bordered">')
+        parts.append(_row("CU CODE", f"MC-030-3:2024-C{i:02d}"))
+        parts.append(_row("CU TITLE", text(max(3, words // 5))))
+        parts.append(_row("CU DESCRIPTOR", f"<p>{text(words)}</p><p>{text(words)}</p>"))
+        parts.append("</table>")
+        parts.append('<table class="table table-bordered">')
+        parts.append("<tr><th>WORK ACTIVITIES</th><th>PERFORMANCE CRITERIA</th></tr>")
+        for j in range(1, activities + 1):
+            pcs = "".join(f"<li>{j}.{k} {text(words)}</li>" for k in range(1, criteria + 1))
+            parts.append(f"<tr><td>{j}. {text(max(4, words // 3))}</td><td><ol>{pcs}</ol></td></tr>")
+        parts.append("</table>")
+    parts.append("</body></html>")
+    return "\n".join(parts)
@@ -0,0 +1,148 @@
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+from taxonomy import taxonomies
+
+# Bump when the shape of cached results changes so stale disk entries are ignored
+CACHE_FORMAT = 3
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(html_bytes, version=None):
+    digest = hashlib.sha256()
+    digest.update(f"{CACHE_FORMAT}:{version or taxonomies.get().version}:".encode("utf-8"))
+    digest.update(html_bytes)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, max_entries=32, cache_dir=None, max_disk_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    # === Memory Tier ===
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        value = self._disk_get(key)
+        if value is not None:
+            self._memory_put(key, value)
+        return value
+
+    def put(self, key, value):
+        self._memory_put(key, value)
+        self._disk_put(key, value)
+
+    def _memory_put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is not None:
+            return value
+        # Concurrent sessions asking for the same content wait for one build
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                value = self.get(key)
+                if value is None:
+                    value = compute()
+                    self.put(key, value)
+        finally:
+            # Also when compute() raises, or the lock would outlive every request for key
+            with self._lock:
+                self._key_locks.pop(key, None)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # === Disk Tier ===
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _disk_get(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)
+            return value
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.warning("Discarding unreadable cache entry %s", path, exc_info=True)
+            self._remove(path)
+            return None
+
+    def _disk_put(self, key, value):
+        if not self.cache_dir:
+            return
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            # The disk tier is best effort: a full disk or an unpicklable result
+            # (PicklingError, TypeError, ...) leaves the value in memory only
+            logger.warning("Could not write cache entry %s", key, exc_info=True)
+            if tmp_path:
+                self._remove(tmp_path)
+            return
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".pkl"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+result_cache = ResultCache(
+    max_entries=int(os.environ.get("CU_ANALYZER_CACHE_SIZE", "32")),
+    cache_dir=os.environ.get("CU_ANALYZER_CACHE_DIR") or None,
+    max_disk_bytes=int(os.environ.get("CU_ANALYZER_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+)
@@ -0,0 +1,102 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from taxonomy import taxonomies, taxonomy_of
+
+
+@dataclass(slots=True, frozen=True)
+class CuRef:
+    document: str
+    position: int
+    code: str
+    title: str
+
+
+class HitMatrix:
+    # hits[cu, field, keyword] = occurrences of keyword in that CU field
+    def __init__(self, hits, cus, fields, keywords, keyword_categories, field_weights):
+        self.hits = hits
+        self.cus = cus
+        self.fields = fields
+        self.keywords = keywords
+        self.keyword_categories = keyword_categories
+        self.field_weights = field_weights
+        self._keyword_index = {kw: i for i, kw in enumerate(keywords)}
+
+    @property
+    def shape(self):
+        return self.hits.shape
+
+    def flat(self):
+        # One row per CU, one column per (field, keyword)
+        return self.hits.reshape(len(self.cus), -1)
+
+    def columns(self):
+        return [(f, kw) for f in self.fields for kw in self.keywords]
+
+    def category_mask(self, category):
+        return np.array([category in cats for cats in self.keyword_categories], dtype=bool)
+
+    def field_scores(self, category):
+        matched = self.hits[:, :, self.category_mask(category)].any(axis=2)
+        return matched * self.field_weights
+
+    def totals(self, category):
+        return self.field_scores(category).sum(axis=1)
+
+    def keyword_frequency(self, category=None):
+        counts = self.hits.sum(axis=(0, 1))
+        if category is not None:
+            counts = np.where(self.category_mask(category), counts, 0)
+        order = np.lexsort((np.array(self.keywords), -counts))
+        return [(self.keywords[i], int(counts[i])) for i in order if counts[i] > 0]
+
+    def keyword_hits(self, keyword):
+        # (cus, fields) occurrences of a single keyword
+        return self.hits[:, :, self._keyword_index[keyword.lower()]]
+
+    def top_cus(self, category, n=10):
+        totals = self.totals(category)
+        order = np.argsort(-totals, kind="stable")[:n]
+        return [(self.cus[i], int(totals[i])) for i in order]
+
+    def select(self, mask):
+        return HitMatrix(
+            self.hits[mask], [cu for cu, keep in zip(self.cus, mask) if keep],
+            self.fields, self.keywords, self.keyword_categories, self.field_weights,
+        )
+
+
+def build_hit_matrix(results, taxonomy=None, field_weights=None):
+    # results: mapping or iterable of (document name, AnalysisResult), all scored with
+    # one taxonomy; the columns come from it. `taxonomy`, if given, must match it.
+    items = list(results.items() if hasattr(results, "items") else results)
+    versions = {result.scores.taxonomy for _, result in items}
+    if len(versions) > 1:
+        raise ValueError(f"Results were scored with different taxonomy versions: {sorted(versions)}")
+    expected = None if taxonomy is None else taxonomies.get(taxonomy)
+    taxonomy = taxonomy_of(items[0][1].scores) if items else expected or taxonomies.get()
+    if expected is not None and expected.version != taxonomy.version:
+        raise ValueError(f"Results were scored with taxonomy version {taxonomy.version}, not {expected.version}")
+    matcher = taxonomy.matcher
+    field_weights = field_weights or taxonomy.weights
+    fields = list(field_weights)
+    column = {kw: i for i, kw in enumerate(matcher.keywords)}
+
+    cus, rows = [], []
+    for name, result in items:
+        for position, (cu, cu_score) in enumerate(zip(result.document.cu_blocks, result.scores.cu_scores), 1):
+            cus.append(CuRef(name, position, cu.code, cu.title))
+            rows.append(cu_score.matches)
+
+    hits = np.zeros((len(rows), len(fields), len(matcher.keywords)), dtype=np.int32)
+    for i, matches in enumerate(rows):
+        for j, f in enumerate(fields):
+            for counts in matches[f].counts.values():
+                for kw, n in counts.items():
+                    hits[i, j, column[kw]] = n
+    return HitMatrix(
+        hits, cus, fields, list(matcher.keywords), list(matcher.keyword_categories),
+        np.array([field_weights[f] for f in fields], dtype=np.int64),
+    )
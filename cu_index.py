@@ -0,0 +1,242 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+
+from taxonomy import taxonomy_of
+
+# Bumped whenever SCHEMA changes; an index with another version is rebuilt empty
+SCHEMA_VERSION = 3
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    noss_code TEXT,
+    noss_title TEXT,
+    indexed_at REAL,
+    -- Taxonomy the scores were computed with: name (for filtering) and version
+    taxonomy TEXT NOT NULL,
+    taxonomy_version TEXT NOT NULL,
+    UNIQUE (name, content_hash)
+);
+CREATE INDEX IF NOT EXISTS documents_taxonomy ON documents(taxonomy);
+CREATE TABLE IF NOT EXISTS cus (
+    id INTEGER PRIMARY KEY,
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    code TEXT,
+    title TEXT
+);
+CREATE INDEX IF NOT EXISTS cus_document ON cus(document_id);
+CREATE TABLE IF NOT EXISTS cu_scores (
+    cu_id INTEGER NOT NULL REFERENCES cus(id) ON DELETE CASCADE,
+    category TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    PRIMARY KEY (category, cu_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cu_scores_total ON cu_scores(category, total);
+CREATE TABLE IF NOT EXISTS cu_keywords (
+    cu_id INTEGER NOT NULL REFERENCES cus(id) ON DELETE CASCADE,
+    keyword TEXT NOT NULL,
+    field TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (keyword, cu_id, field)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cu_keywords_cu ON cu_keywords(cu_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS cu_fts USING fts5(
+    code, title, descriptor, work_activities, performance_criteria
+);
+"""
+
+SCHEMA_TABLES = ["cu_fts", "cu_keywords", "cu_scores", "cus", "documents"]
+
+# FTS column order; names match the weighted CU fields
+FTS_FIELDS = ["CU CODE", "CU TITLE", "CU DESCRIPTOR", "WORK ACTIVITY", "PERFORMANCE CRITERIA"]
+
+
+@dataclass(slots=True)
+class SearchHit:
+    document: str
+    position: int
+    code: str
+    title: str
+    scores: dict = field(default_factory=dict)
+    fields: list = field(default_factory=list)
+
+
+logger = logging.getLogger(__name__)
+
+
+class CuIndex:
+    def __init__(self, path, timeout=30):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+    def _conn(self):
+        # sqlite3 connections are per thread; Streamlit serves sessions from several
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._migrate(conn)
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self, conn):
+        with self._write_lock, conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'documents'").fetchone():
+                    # Derived data: re-adding the documents rebuilds it
+                    logger.warning("Search index %s has schema %d, not %d; rebuilding it empty",
+                                   self.path, version, SCHEMA_VERSION)
+                for table in SCHEMA_TABLES:
+                    conn.execute(f"DROP TABLE IF EXISTS {table}")
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.executescript(SCHEMA)
+
+    # === Updates ===
+    def is_current(self, name, content_hash, conn=None):
+        row = (conn or self._conn()).execute(
+            "SELECT 1 FROM documents WHERE name = ? AND content_hash = ?", (name, content_hash)
+        ).fetchone()
+        return row is not None
+
+    def add(self, name, result):
+        # Documents are keyed by (name, content hash): different files uploaded under
+        # the same name coexist. Returns False when this content is already indexed.
+        if self.is_current(name, result.key):
+            return False
+        document, scores = result.document, result.scores
+        taxonomy = taxonomy_of(scores)
+        with self._write_lock, self._conn() as conn:
+            if self.is_current(name, result.key, conn):
+                return False
+            doc_id = conn.execute(
+                "INSERT INTO documents (name, content_hash, noss_code, noss_title, indexed_at, taxonomy, taxonomy_version)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (name, result.key, document.profile_data.get("NOSS CODE", ""),
+                 document.profile_data.get("NOSS TITLE", ""), time.time(), taxonomy.name, taxonomy.version),
+            ).lastrowid
+            for position, (cu, cu_score) in enumerate(zip(document.cu_blocks, scores.cu_scores), 1):
+                cu_id = conn.execute(
+                    "INSERT INTO cus (document_id, position, code, title) VALUES (?, ?, ?, ?)",
+                    (doc_id, position, cu.code, cu.title),
+                ).lastrowid
+                conn.execute(
+                    "INSERT INTO cu_fts (rowid, code, title, descriptor, work_activities, performance_criteria)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (cu_id, *(cu.get(f) for f in FTS_FIELDS)),
+                )
+                conn.executemany(
+                    "INSERT INTO cu_scores (cu_id, category, total) VALUES (?, ?, ?)",
+                    [(cu_id, category, total) for category, total in cu_score.totals.items()],
+                )
+                conn.executemany(
+                    "INSERT INTO cu_keywords (cu_id, keyword, field, count) VALUES (?, ?, ?, ?)",
+                    {
+                        (cu_id, kw, f, n)
+                        for f, match in cu_score.matches.items()
+                        for counts in match.counts.values()
+                        for kw, n in counts.items()
+                    },
+                )
+        return True
+
+    def remove(self, name):
+        with self._write_lock, self._conn() as conn:
+            self._delete(conn, name)
+
+    @staticmethod
+    def _delete(conn, name):
+        conn.execute(
+            "DELETE FROM cu_fts WHERE rowid IN"
+            " (SELECT cus.id FROM cus JOIN documents d ON d.id = cus.document_id WHERE d.name = ?)",
+            (name,),
+        )
+        conn.execute("DELETE FROM documents WHERE name = ?", (name,))
+
+    # === Queries ===
+    def search(self, text=None, keyword=None, min_scores=None, limit=50, taxonomy=None):
+        # taxonomy: only documents scored with the taxonomy of this name
+        conn = self._conn()
+        columns = ["c.id", "d.name", "c.position", "c.code", "c.title"]
+        joins, where, params = [], [], []
+        if taxonomy:
+            where.append("d.taxonomy = ?")
+            params.append(taxonomy)
+        if text:
+            joins.append("JOIN cu_fts ON cu_fts.rowid = c.id")
+            where.append("cu_fts MATCH ?")
+            params.append('"' + text.replace('"', '""') + '"')
+            # highlight() marks matched tokens, which tells us which fields matched
+            columns += [f"highlight(cu_fts, {i}, char(2), '')" for i in range(len(FTS_FIELDS))]
+        if keyword:
+            where.append("c.id IN (SELECT cu_id FROM cu_keywords WHERE keyword = ?)")
+            params.append(keyword.lower())
+        for category, minimum in (min_scores or {}).items():
+            if minimum:
+                where.append("c.id IN (SELECT cu_id FROM cu_scores WHERE category = ? AND total >= ?)")
+                params += [category, minimum]
+        order = "cu_fts.rank" if text else "d.name, c.position"
+        sql = (
+            f"SELECT {', '.join(columns)} FROM cus c JOIN documents d ON d.id = c.document_id {' '.join(joins)}"
+            f"{' WHERE ' + ' AND '.join(where) if where else ''} ORDER BY {order} LIMIT ?"
+        )
+        hits = {}
+        for row in conn.execute(sql, (*params, limit)):
+            hit = SearchHit(row[1], row[2], row[3], row[4])
+            if text:
+                hit.fields = [f for f, marked in zip(FTS_FIELDS, row[5:]) if "\x02" in (marked or "")]
+            hits[row[0]] = hit
+        if not hits:
+            return []
+
+        placeholders = ", ".join("?" * len(hits))
+        for cu_id, category, total in conn.execute(
+            f"SELECT cu_id, category, total FROM cu_scores WHERE cu_id IN ({placeholders})", list(hits)
+        ):
+            hits[cu_id].scores[category] = total
+        if keyword:
+            for cu_id, f in conn.execute(
+                f"SELECT cu_id, field FROM cu_keywords WHERE keyword = ? AND cu_id IN ({placeholders})",
+                [keyword.lower(), *hits],
+            ):
+                if f not in hits[cu_id].fields:
+                    hits[cu_id].fields.append(f)
+        return list(hits.values())
+
+    def stats(self, taxonomy=None):
+        conn = self._conn()
+        where, params = ("WHERE d.taxonomy = ?", (taxonomy,)) if taxonomy else ("", ())
+        documents = conn.execute(f"SELECT COUNT(*) FROM documents d {where}", params).fetchone()[0]
+        cus = conn.execute(
+            f"SELECT COUNT(*) FROM cus c JOIN documents d ON d.id = c.document_id {where}", params
+        ).fetchone()[0]
+        return {"documents": documents, "cus": cus}
+
+    def taxonomy_names(self):
+        return [row[0] for row in self._conn().execute("SELECT DISTINCT taxonomy FROM documents ORDER BY taxonomy")]
+
+    def categories(self, taxonomy):
+        # Score categories of the documents indexed under a taxonomy name
+        return [row[0] for row in self._conn().execute(
+            "SELECT DISTINCT s.category FROM cu_scores s JOIN cus c ON c.id = s.cu_id"
+            " JOIN documents d ON d.id = c.document_id WHERE d.taxonomy = ? ORDER BY s.category",
+            (taxonomy,),
+        )]
+
+
+# The app's index waits only briefly for a lock held by another writer (e.g. a batch run)
+search_index = CuIndex(
+    os.environ.get("CU_ANALYZER_INDEX", "cu_index.sqlite3"),
+    timeout=float(os.environ.get("CU_ANALYZER_INDEX_TIMEOUT", "2")),
+)
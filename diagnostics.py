@@ -0,0 +1,140 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass
+
+logger = logging.getLogger(__name__)
+# Streamlit leaves the root logger unconfigured; emit stage records as JSON lines on stderr
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# Set to log every run's stage timings, not only runs with the panel open
+log_every_run = os.environ.get("CU_ANALYZER_DIAGNOSTICS_LOG", "") not in ("", "0")
+
+# tracemalloc is process-wide: memory-tracked runs hold this lock from start to
+# finish, so they run one at a time and never reset or stop each other's tracing
+_memory_lock = threading.Lock()
+
+
+@dataclass(slots=True)
+class StageTiming:
+    name: str
+    calls: int = 0
+    wall: float = 0.0
+    cpu: float = 0.0
+    # Process-wide tracemalloc peak above the stage's starting allocation (includes
+    # untracked sessions running meanwhile); None when not tracked or on another thread
+    peak_bytes: int | None = None
+
+
+class RunDiagnostics:
+    # Per-stage wall/CPU time (and optionally memory) for one analysis run.
+    # CPU time is per thread, so concurrent sessions do not inflate it.
+    def __init__(self, label="", memory=False, profile=False):
+        self.label = label
+        self.memory = memory
+        self.stages = {}
+        self.started = time.time()
+        self.cached = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Peaks are measured only on the thread that started the run: stages on other
+        # threads would reset its peak, so they record wall/CPU time only
+        self._memory_thread = threading.get_ident()
+        self._own_tracemalloc = False
+        if memory:
+            _memory_lock.acquire()
+            self._own_tracemalloc = not tracemalloc.is_tracing()
+            if self._own_tracemalloc:
+                tracemalloc.start()
+        self._profiler = cProfile.Profile() if profile else None
+        if self._profiler:
+            self._profiler.enable()
+
+    @contextmanager
+    def stage(self, name):
+        stack = self._local.__dict__.setdefault("stack", [])
+        memory = self.memory and threading.get_ident() == self._memory_thread
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1][1] = max(stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            stack.append([current, 0])
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+            peak = None
+            if memory:
+                start, inner_peak = stack.pop()
+                top = max(inner_peak, tracemalloc.get_traced_memory()[1])
+                tracemalloc.reset_peak()
+                if stack:
+                    stack[-1][1] = max(stack[-1][1], top)
+                peak = max(top - start, 0)
+            self._record(name, wall, cpu, peak)
+
+    def _record(self, name, wall, cpu, peak):
+        with self._lock:
+            timing = self.stages.setdefault(name, StageTiming(name))
+            timing.calls += 1
+            timing.wall += wall
+            timing.cpu += cpu
+            if peak is not None:
+                timing.peak_bytes = max(timing.peak_bytes or 0, peak)
+
+    def finish(self, log=False):
+        if self._profiler:
+            self._profiler.disable()
+        if self.memory:
+            # Stages after finish (e.g. fragment reruns) are no longer tracked
+            self.memory = False
+            if self._own_tracemalloc:
+                tracemalloc.stop()
+            _memory_lock.release()
+        if log or log_every_run:
+            self.log()
+        return self
+
+    # === Export ===
+    def to_dict(self):
+        return {
+            "label": self.label,
+            "started": self.started,
+            "cached": self.cached,
+            "stages": [asdict(t) for t in self.stages.values()],
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def log(self, log=logger):
+        # One structured record per stage; the message is JSON so log shippers can parse it
+        for timing in self.stages.values():
+            record = {"event": "stage", "run": self.label, "cached": self.cached, **asdict(timing)}
+            log.info(json.dumps(record), extra={"diagnostics": record})
+
+    def profile_stats(self, limit=30, sort="cumulative"):
+        if not self._profiler:
+            return ""
+        out = io.StringIO()
+        pstats.Stats(self._profiler, stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+def stage(diagnostics, name):
+    # Lets instrumented code accept diagnostics=None without branching at every call site
+    return nullcontext() if diagnostics is None else diagnostics.stage(name)
@@ -0,0 +1,123 @@
+import re
+from collections import Counter
+
+_word_char = re.compile(r"\w")
+
+
+def _lower(text):
+    # Spans index into the original text, so lowering must not change its length
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        lowered = "".join(c.lower()[0] for c in text)
+    return lowered
+
+
+def _is_word(text, i):
+    return _word_char.match(text, i) is not None
+
+
+class FieldMatch:
+    __slots__ = ("text", "spans", "counts", "hits")
+
+    def __init__(self, text, spans, counts):
+        self.text = text
+        self.spans = spans
+        self.counts = counts
+        self.hits = frozenset(counts)
+
+    def highlight(self, marks, word_boundary=True, start=0, end=None):
+        # marks: {category: (open, close)}. Leftmost-longest, non-overlapping
+        # selection; same result as a regex alternation of the keywords sorted
+        # by length (longest first), wrapped in \b when word_boundary is set
+        text = self.text
+        end = len(text) if end is None else end
+        out, pos = [], start
+        for s, e, category in self.spans:
+            if s < pos or e > end:
+                continue
+            if word_boundary and (
+                (s > start and _is_word(text, s - 1)) or (e < end and _is_word(text, e))
+            ):
+                continue
+            mark = marks.get(category)
+            if mark is None:
+                continue
+            out += (text[pos:s], mark[0], text[s:e], mark[1])
+            pos = e
+        out.append(text[pos:end])
+        return "".join(out)
+
+
+class KeywordMatcher:
+    def __init__(self, categories):
+        self.categories = {name: list(kws) for name, kws in categories.items()}
+        self.keywords = []
+        self.keyword_categories = []
+        index = {}
+        for name, kws in self.categories.items():
+            for kw in kws:
+                kw = kw.lower()
+                if kw not in index:
+                    index[kw] = len(self.keywords)
+                    self.keywords.append(kw)
+                    self.keyword_categories.append([])
+                if name not in self.keyword_categories[index[kw]]:
+                    self.keyword_categories[index[kw]].append(name)
+        self.keyword_categories = [tuple(c) for c in self.keyword_categories]
+
+        self._lengths = [len(kw) for kw in self.keywords]
+
+    def scan(self, text):
+        # One str.find sweep per keyword: the same C-level search the substring
+        # tests did, in a single pass instead of one for `in` and one for count()
+        lengths, categories = self._lengths, self.keyword_categories
+        lowered = _lower(text)
+        spans, counts = [], {}
+        for idx, kw in enumerate(self.keywords):
+            s = lowered.find(kw)
+            if s < 0:
+                continue
+            length, category = lengths[idx], categories[idx][0]
+            n = last_end = 0
+            while s >= 0:
+                spans.append((s, s + length, category))
+                # str.count semantics: occurrences of one keyword never overlap
+                if s >= last_end:
+                    n += 1
+                    last_end = s + length
+                s = lowered.find(kw, s + 1)
+            for name in categories[idx]:
+                counts.setdefault(name, Counter())[kw] += n
+        spans.sort(key=lambda span: (span[0], span[0] - span[1]))
+        return FieldMatch(text, spans, counts)
+
+
+class Highlighter:
+    # Renders FieldMatch spans with per-format templates ("<mark>{}</mark>", ...).
+    # Templates are split once here, so one instance serves every field,
+    # document and session for its matcher.
+    def __init__(self, matcher, templates, word_boundary=True):
+        self.matcher = matcher
+        self.word_boundary = word_boundary
+        self.marks = {
+            fmt: {category: tuple(template.split("{}", 1)) for category, template in marks.items()}
+            for fmt, marks in templates.items()
+        }
+
+    def render(self, match, fmt, start=0, end=None):
+        if isinstance(match, str):
+            match = self.matcher.scan(match)
+        return match.highlight(self.marks[fmt], self.word_boundary, start, end)
+
+    def items(self, match, fmt, sep=" - "):
+        # Highlights each sep-separated item in place, so spans keep their offsets
+        if isinstance(match, str):
+            match = self.matcher.scan(match)
+        items, pos = [], 0
+        for part in match.text.split(sep):
+            item = part.strip()
+            if item:
+                start = pos + len(part) - len(part.lstrip())
+                items.append(self.render(match, fmt, start, start + len(item)))
+            pos += len(part) + len(sep)
+        return items
@@ -0,0 +1,324 @@
+import logging
+import os
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from html import unescape
+from html.entities import html5 as html5_entities
+from html.parser import HTMLParser
+from itertools import chain
+
+from taxonomy import taxonomies
+
+PROFILE_FIELDS = ["SECTION", "GROUP", "AREA", "NOSS CODE", "NOSS TITLE", "NOSS LEVEL"]
+CU_FIELDS = ["CU CODE", "CU TITLE", "CU DESCRIPTOR"]
+
+
+# === Document Model ===
+@dataclass(slots=True)
+class CompetencyUnit:
+    code: str = ""
+    title: str = ""
+    descriptor: str = ""
+    work_activities: list = field(default_factory=list)
+    performance_criteria: list = field(default_factory=list)
+
+    def get(self, name, default=""):
+        if name == "CU CODE":
+            return self.code
+        if name == "CU TITLE":
+            return self.title
+        if name == "CU DESCRIPTOR":
+            return self.descriptor
+        if name == "WORK ACTIVITY":
+            return " - ".join(self.work_activities)
+        if name == "PERFORMANCE CRITERIA":
+            return " - ".join(self.performance_criteria)
+        return default
+
+
+@dataclass(slots=True)
+class NossDocument:
+    profile_data: dict = field(default_factory=dict)
+    cu_blocks: list = field(default_factory=list)
+
+
+# === Parse Stage ===
+PARSER_BACKENDS = ("soup", "stream")
+default_backend = os.environ.get("CU_ANALYZER_PARSER", "soup")
+logger = logging.getLogger(__name__)
+
+
+def _cell_text(strings, separator=""):
+    return separator.join(s for s in (s.strip() for s in strings) if s)
+
+
+class _SoupTable:
+    __slots__ = ("_tag", "text")
+
+    def __init__(self, tag):
+        self._tag = tag
+        self.text = tag.text
+
+    @property
+    def rows(self):
+        return [[list(td.strings) for td in tr.find_all("td")] for tr in self._tag.find_all("tr")]
+
+
+def _soup_tables(html_content):
+    # Imported on first parse: bs4 is the slowest part of starting the app
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html_content, "html.parser")
+    for table in soup.find_all("table", class_="table"):
+        yield _SoupTable(table)
+
+
+class _StreamTable:
+    __slots__ = ("chunks", "rows", "closed")
+
+    def __init__(self):
+        self.chunks, self.rows, self.closed = [], [], False
+
+    @property
+    def text(self):
+        return "".join(self.chunks)
+
+
+class _TableStreamParser(HTMLParser):
+    # Mirrors how BeautifulSoup's html.parser tree builder nests, closes and
+    # collects strings, but only for the elements the extractor reads.
+    # Completed class="table" tables are queued in document order.
+    void = {
+        "area", "base", "basefont", "bgsound", "br", "col", "command", "embed", "frame", "hr", "image", "img",
+        "input", "isindex", "keygen", "link", "menuitem", "meta", "nextid", "param", "source", "spacer", "track", "wbr",
+    }
+    opaque = {"script", "style", "template", "rt", "rp"}
+    preserve = {"pre", "textarea"}
+    ascii_spaces = set("\x20\x0a\x09\x0c\x0d")
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.stack = []
+        self.data = []
+        self.closed_void = []
+        self.pending = deque()
+        self.ready = deque()
+
+    def _open(self, name):
+        return [item for tag, item in self.stack if tag == name and item is not None]
+
+    def _flush(self, cdata=False):
+        if not self.data:
+            return
+        data = "".join(self.data)
+        self.data = []
+        names = {name for name, _ in self.stack}
+        if names & self.opaque and not cdata:
+            return
+        if not names & self.preserve and all(c in self.ascii_spaces for c in data):
+            data = "\n" if "\n" in data else " "
+        for name, item in self.stack:
+            if item is None:
+                continue
+            if name == "table":
+                item.chunks.append(data)
+            elif name == "td":
+                item.append(data)
+
+    def _pop_to(self, tag):
+        if all(name != tag for name, _ in self.stack):
+            return
+        while True:
+            name, item = self.stack.pop()
+            if name == "table" and item is not None:
+                item.closed = True
+            if name == tag:
+                break
+        while self.pending and self.pending[0].closed:
+            self.ready.append(self.pending.popleft())
+
+    def handle_starttag(self, tag, attrs, close_void=True):
+        self._flush()
+        item = None
+        if tag == "table":
+            classes = dict(attrs).get("class") or ""
+            if "table" in classes.split():
+                item = _StreamTable()
+                self.pending.append(item)
+        elif tag == "tr":
+            item = []
+            for table in self._open("table"):
+                table.rows.append(item)
+        elif tag == "td":
+            item = []
+            for row in self._open("tr"):
+                row.append(item)
+        self.stack.append((tag, item))
+        if close_void and tag in self.void:
+            self.handle_endtag(tag, check_void=False)
+            self.closed_void.append(tag)
+
+    def handle_endtag(self, tag, check_void=True):
+        self._flush()
+        if check_void and tag in self.closed_void:
+            self.closed_void.remove(tag)
+        else:
+            self._pop_to(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, close_void=False)
+        self.handle_endtag(tag, check_void=False)
+
+    def handle_data(self, data):
+        self.data.append(data)
+
+    def handle_entityref(self, name):
+        self.data.append(html5_entities.get(name + ";", "&" + name))
+
+    def handle_charref(self, name):
+        self.data.append(unescape(f"&#{name};"))
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def handle_decl(self, decl):
+        self._flush()
+
+    def handle_pi(self, data):
+        self._flush()
+
+    def unknown_decl(self, data):
+        self._flush()
+        if data.upper().startswith("CDATA["):
+            self.data.append(data[len("CDATA["):])
+            self._flush(cdata=True)
+
+    def close(self):
+        super().close()
+        self._flush()
+        for table in self.pending:
+            table.closed = True
+        self.ready.extend(self.pending)
+        self.pending.clear()
+
+
+def _stream_tables(html_content, chunk_size=1 << 16):
+    parser = _TableStreamParser()
+    chunks = (html_content[i:i + chunk_size] for i in range(0, len(html_content), chunk_size)) \
+        if isinstance(html_content, str) else html_content
+    for chunk in chunks:
+        parser.feed(chunk)
+        while parser.ready:
+            yield parser.ready.popleft()
+    parser.close()
+    yield from parser.ready
+
+
+def _make_cu(fields, was, pcs):
+    return CompetencyUnit(
+        code=fields.get("CU CODE", ""),
+        title=fields.get("CU TITLE", ""),
+        descriptor=fields.get("CU DESCRIPTOR", ""),
+        work_activities=was,
+        performance_criteria=pcs,
+    )
+
+
+def iter_cu_blocks(tables):
+    # CU fields carry over to the next CU when its table omits them
+    current_cu, current_was, current_pcs = {}, [], []
+    for table in tables:
+        table_text = table.text
+        if "CU CODE" in table_text and "CU TITLE" in table_text:
+            if current_cu:
+                yield _make_cu(current_cu, current_was, current_pcs)
+                current_was, current_pcs = [], []
+            for cells in table.rows:
+                if len(cells) == 2:
+                    key = _cell_text(cells[0])
+                    val = _cell_text(cells[1], " ")
+                    if key in CU_FIELDS:
+                        current_cu[key] = val
+        elif "WORK ACTIVITIES" in table_text and "PERFORMANCE CRITERIA" in table_text:
+            for cells in table.rows[1:]:
+                if len(cells) == 2:
+                    current_was.append(_cell_text(cells[0], " "))
+                    current_pcs.append(_cell_text(cells[1], " "))
+    if current_cu:
+        yield _make_cu(current_cu, current_was, current_pcs)
+
+
+def _build_document(tables):
+    document = NossDocument()
+    profile_table = next(tables, None)
+    if profile_table is None:
+        return document
+    for cells in profile_table.rows:
+        if len(cells) == 2:
+            document.profile_data[_cell_text(cells[0])] = _cell_text(cells[1], " ")
+    document.cu_blocks.extend(iter_cu_blocks(chain([profile_table], tables)))
+    return document
+
+
+def parse_noss(html_content, backend=None):
+    backend = backend or default_backend
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend: {backend!r}")
+    if backend == "stream":
+        try:
+            return _build_document(_stream_tables(html_content))
+        except Exception:
+            logger.exception("Streaming parser failed, falling back to BeautifulSoup")
+            if not isinstance(html_content, str):
+                raise
+    return _build_document(_soup_tables(html_content))
+
+
+# === Scoring Stage ===
+@dataclass(slots=True)
+class CuScore:
+    matches: dict
+    scores: dict
+    totals: dict
+
+
+@dataclass(slots=True)
+class DocumentScore:
+    cu_scores: list = field(default_factory=list)
+    keyword_counts: dict = field(default_factory=dict)
+    # Version of the taxonomy the scores were computed with
+    taxonomy: str = ""
+
+
+def score_cu(cu, taxonomy=None):
+    taxonomy = taxonomies.get(taxonomy)
+    weights, matcher = taxonomy.weights, taxonomy.matcher
+    matches = {k: matcher.scan(cu.get(k, "")) for k in weights}
+    scores = {
+        category: {k: weights[k] if category in matches[k].hits else 0 for k in weights}
+        for category in matcher.categories
+    }
+    totals = {category: sum(field_scores.values()) for category, field_scores in scores.items()}
+    return CuScore(matches, scores, totals)
+
+
+def score_document(document, taxonomy=None):
+    taxonomy = taxonomies.get(taxonomy)
+    result = DocumentScore(
+        keyword_counts={category: Counter() for category in taxonomy.codes}, taxonomy=taxonomy.version
+    )
+    for cu in document.cu_blocks:
+        cu_score = score_cu(cu, taxonomy)
+        for match in cu_score.matches.values():
+            for category, counts in match.counts.items():
+                result.keyword_counts[category].update(counts)
+        result.cu_scores.append(cu_score)
+    return result
+
+
+@dataclass(slots=True)
+class AnalysisResult:
+    document: NossDocument
+    scores: DocumentScore
+    key: str = ""
+    pdf: bytes = b""
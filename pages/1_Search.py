@@ -0,0 +1,60 @@
+import time
+
+import streamlit as st
+
+from cu_index import search_index
+from taxonomy import taxonomies
+
+# === Streamlit UI ===
+st.set_page_config(page_title="CU Search", layout="wide")
+st.title("🔎 Search Analyzed CUs")
+
+# === Keyword Taxonomy ===
+# Scores are only comparable within one taxonomy, so every search is limited to one
+# Documents are indexed under their taxonomy's own name, which may differ from its file name
+available = {t.name: t for t in map(taxonomies.get, taxonomies.names())}
+taxonomy_names = sorted(set(available) | set(search_index.taxonomy_names()))
+taxonomy_name = taxonomies.get().name
+if len(taxonomy_names) > 1:
+    default_index = taxonomy_names.index(taxonomy_name) if taxonomy_name in taxonomy_names else 0
+    taxonomy_name = st.sidebar.selectbox("Keyword taxonomy", taxonomy_names, index=default_index)
+if taxonomy_name in available:
+    codes, keywords = available[taxonomy_name].codes, sorted(available[taxonomy_name].matcher.keywords)
+else:
+    # Indexed with a taxonomy file that is no longer there: its categories come from the index
+    codes, keywords = search_index.categories(taxonomy_name), []
+
+stats = search_index.stats(taxonomy_name)
+st.markdown(
+    f"Searching **{stats['cus']}** CUs from **{stats['documents']}** NOSS files indexed with the "
+    f"**{taxonomy_name}** taxonomy."
+)
+
+text = st.text_input("Text (CU code, title, descriptor, work activities or performance criteria)")
+col_keyword, *score_cols, col_limit = st.columns([3, *[1] * len(codes), 1])
+keyword = col_keyword.selectbox("Keyword", [""] + keywords)
+min_scores = {
+    code: col.number_input(f"Min {code} Total (%)", min_value=0, max_value=100, step=5)
+    for code, col in zip(codes, score_cols)
+}
+limit = col_limit.number_input("Max results", min_value=10, max_value=5000, value=200, step=10)
+
+if text or keyword or any(min_scores.values()):
+    start = time.perf_counter()
+    hits = search_index.search(
+        text=text.strip(), keyword=keyword, min_scores=min_scores, limit=limit, taxonomy=taxonomy_name
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    st.caption(f"{len(hits)} matching CUs in {elapsed:.1f} ms")
+    if hits:
+        st.dataframe(
+            {
+                "NOSS file": [hit.document for hit in hits],
+                "CU #": [hit.position for hit in hits],
+                "CU CODE": [hit.code for hit in hits],
+                "CU TITLE": [hit.title for hit in hits],
+                **{f"{code} Total (%)": [hit.scores.get(code, 0) for hit in hits] for code in codes},
+                "Matched fields": [", ".join(hit.fields) for hit in hits],
+            },
+            width="stretch", hide_index=True,
+        )
@@ -0,0 +1,270 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate, Paragraph, PageBreak, Table, TableStyle, Spacer
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import cm
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_JUSTIFY
+from noss import PROFILE_FIELDS, CompetencyUnit, CuScore, DocumentScore, NossDocument, parse_noss, score_document
+from taxonomy import taxonomies, taxonomy_of
+
+try:
+    from pypdf import PdfWriter
+except ImportError:  # optional: without it reports always build in one process
+    PdfWriter = None
+
+styles = getSampleStyleSheet()
+styleN = styles['Normal']
+styleH = styles['Heading2']
+wrap_style = ParagraphStyle(name='WrapStyle', parent=styleN, alignment=TA_JUSTIFY, spaceAfter=6)
+
+# Built once per process and shared by every table of every report
+cu_table_style = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('INNERGRID', (0, 0), (-1, -1), 0.3, colors.grey),
+    ('BOX', (0, 0), (-1, -1), 0.6, colors.black),
+])
+summary_table_style = TableStyle([*cu_table_style.getCommands(), ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey)])
+LABELS = {
+    "CU CODE": "CU CODE",
+    "CU TITLE": "CU TITLE",
+    "CU DESCRIPTOR": "CU<br/>DESCRIPTOR",
+    "WORK ACTIVITY": "WORK<br/>ACTIVITIES",
+    "PERFORMANCE CRITERIA": "PERFORMANCE<br/>CRITERIA",
+    "TOTAL MATCH (%)": "TOTAL<br/>MATCH (%)"
+}
+
+FRAME_WIDTH_CM = 17
+LABEL_COL_CM = 3.5
+TEXT_COL_MIN_CM = 5
+
+# Reports with more CUs than one chunk are split into parts built in parallel
+# (needs pypdf to merge them); 1 worker builds everything in-process
+pdf_workers = int(os.environ.get("CU_ANALYZER_PDF_WORKERS", "1"))
+pdf_chunk_cus = int(os.environ.get("CU_ANALYZER_PDF_CHUNK_CUS", "50"))
+# Never fork: builds are requested from threads of a multi-threaded server
+pdf_start_method = os.environ.get("CU_ANALYZER_PDF_START_METHOD") or (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+def _col_widths(n_scores, score_cm):
+    # 17 cm of frame width: a 3.5 cm label column, the text column, then one
+    # score column per category. Score columns narrow before the text column
+    # drops below TEXT_COL_MIN_CM (taxonomy.MAX_CATEGORIES keeps them readable).
+    score_cm = min(score_cm, (FRAME_WIDTH_CM - LABEL_COL_CM - TEXT_COL_MIN_CM) / n_scores)
+    text_cm = FRAME_WIDTH_CM - LABEL_COL_CM - score_cm * n_scores
+    return [LABEL_COL_CM * cm, text_cm * cm] + [score_cm * cm] * n_scores
+
+
+def highlight_keywords(match, taxonomy=None):
+    return taxonomies.get(taxonomy).highlighter.render(match, "pdf")
+
+
+def label(name):
+    return Paragraph(LABELS.get(name, name), wrap_style)
+
+def process_html_to_pdf(html_content, output_path):
+    document = parse_noss(html_content)
+    return build_pdf_report(document, score_document(document), output_path)
+
+
+def _profile_flowables(profile_data):
+    flowables = []
+    flowables.append(Paragraph("<b>NOSS PROFILE</b>", styleH))
+    flowables.append(Spacer(1, 0.3 * cm))
+    for label_text in PROFILE_FIELDS:
+        flowables.append(Paragraph(f"<b>{label_text}:</b> {profile_data.get(label_text, '')}", styleN))
+    flowables.append(PageBreak())
+    return flowables
+
+
+def _summary_flowables(cu_blocks, scores, codes):
+    flowables = []
+    flowables.append(Paragraph("<b>Summary of CU Keyword Match Scores</b>", styleH))
+    summary_data = [[
+        Paragraph("<b>CU CODE</b>", wrap_style),
+        Paragraph("<b>CU TITLE</b>", wrap_style),
+        *[Paragraph(f"<b>{code} Total (%)</b>", wrap_style) for code in codes]
+    ]]
+    for cu, cu_score in zip(cu_blocks, scores.cu_scores):
+        summary_data.append([
+            Paragraph(cu.get("CU CODE", ""), wrap_style),
+            Paragraph(cu.get("CU TITLE", ""), wrap_style),
+            *[f"{cu_score.totals[code]}%" for code in codes]
+        ])
+    col_widths = _col_widths(len(codes), 2.5)
+    summary_table = Table(summary_data, colWidths=col_widths)
+    summary_table.setStyle(summary_table_style)
+    flowables.append(summary_table)
+    flowables.append(PageBreak())
+    return flowables
+
+
+def _cu_flowables(i, cu, cu_score, taxonomy):
+    flowables = []
+    matches, codes = cu_score.matches, taxonomy.codes
+    col_widths = _col_widths(len(codes), 1.25)
+
+    def cells(field, first=True):
+        return [f"{cu_score.scores[code][field]}%" if first else "" for code in codes]
+
+    cu_title = highlight_keywords(matches["CU TITLE"], taxonomy)
+    cu_desc = highlight_keywords(matches["CU DESCRIPTOR"], taxonomy)
+    cu_wa = highlight_keywords(matches["WORK ACTIVITY"], taxonomy)
+    cu_pc = highlight_keywords(matches["PERFORMANCE CRITERIA"], taxonomy)
+
+    flowables.append(Paragraph(f"<b>CU #{i}</b>", styleH))
+    flowables.append(Spacer(1, 0.2 * cm))
+
+    table_top = Table([
+        [label("CU CODE"), Paragraph(cu.get("CU CODE", ""), wrap_style), *[""] * len(codes)],
+        [label("CU TITLE"), Paragraph(cu_title, wrap_style), *cells("CU TITLE")],
+        [label("CU DESCRIPTOR"), Paragraph(cu_desc, wrap_style), *cells("CU DESCRIPTOR")]
+    ], colWidths=col_widths)
+    table_top.setStyle(cu_table_style)
+    flowables.append(table_top)
+
+    wa_data = []
+    for j, item in enumerate(cu_wa.split(" - ")):
+        wa_data.append([
+            label("WORK ACTIVITY") if j == 0 else "",
+            Paragraph(f"• {item.strip()}", wrap_style),
+            *cells("WORK ACTIVITY", j == 0)
+        ])
+    table_wa = Table(wa_data, colWidths=col_widths)
+    table_wa.setStyle(cu_table_style)
+    flowables.append(table_wa)
+
+    pc_data = []
+    for j, item in enumerate(cu_pc.split(" - ")):
+        pc_data.append([
+            label("PERFORMANCE CRITERIA") if j == 0 else "",
+            Paragraph(f"• {item.strip()}", wrap_style),
+            *cells("PERFORMANCE CRITERIA", j == 0)
+        ])
+    table_pc = Table(pc_data, colWidths=col_widths)
+    table_pc.setStyle(cu_table_style)
+    flowables.append(table_pc)
+    flowables.append(PageBreak())
+    return flowables
+
+
+def _keyword_flowables(scores, taxonomy):
+    flowables = []
+    categories = list(taxonomy.categories.values())
+    for n, category in enumerate(categories, 1):
+        matched = {kw: count for kw, count in scores.keyword_counts[category.code].items() if count > 0}
+        if matched:
+            flowables.append(Paragraph(f"<b>Matched {category.title} Keywords</b>", styleH))
+            for kw, count in sorted(matched.items(), key=lambda x: (-x[1], x[0])):
+                flowables.append(Paragraph(f"• {kw} ({count})", styleN))
+            if n < len(categories):
+                flowables.append(Spacer(1, 0.3 * cm))
+    return flowables
+
+
+def report_sections(document, scores, cu_range=None, head=True, tail=True, taxonomy=None, number_from=1):
+    # Flowables one section at a time; every section but the last ends in a
+    # PageBreak, so any run of sections renders the same pages on its own.
+    # number_from numbers the CUs of a part that holds only a slice of them.
+    cu_blocks, taxonomy = document.cu_blocks, taxonomy or taxonomy_of(scores)
+    if head:
+        # === NOSS Profile ===
+        yield _profile_flowables(document.profile_data)
+        # === Summary Table ===
+        yield _summary_flowables(cu_blocks, scores, taxonomy.codes)
+    # === CU Details ===
+    for i in range(len(cu_blocks)) if cu_range is None else cu_range:
+        yield _cu_flowables(number_from + i, cu_blocks[i], scores.cu_scores[i], taxonomy)
+    # === Keyword Summary ===
+    if tail:
+        yield _keyword_flowables(scores, taxonomy)
+
+
+class _LazyFlowables(list):
+    # doc.build() consumes flowables from the front and checks len() before
+    # each one; topping up here keeps only a few sections alive at a time
+    def __init__(self, sections, low_water=32):
+        super().__init__()
+        self._sections = iter(sections)
+        self._low_water = low_water
+
+    def __len__(self):
+        while self._sections is not None and list.__len__(self) < self._low_water:
+            section = next(self._sections, None)
+            if section is None:
+                self._sections = None
+            else:
+                self.extend(section)
+        return list.__len__(self)
+
+
+def _build(sections, output):
+    doc = SimpleDocTemplate(output, pagesize=A4, rightMargin=2*cm, leftMargin=2*cm, topMargin=2*cm, bottomMargin=2*cm)
+    story = _LazyFlowables(sections)
+    doc.build(story)
+    # Only works while build() consumes this list in place; a build that copies it
+    # (e.g. multiBuild) would render the first few sections and silently stop
+    if story._sections is not None or list.__len__(story):
+        raise RuntimeError("ReportLab did not consume every report section; the PDF would be incomplete")
+    return output
+
+
+def _build_part(document, scores, cu_range, head, tail, number_from, taxonomy):
+    # taxonomy travels with the part: a spawned worker's registry may not have it loaded
+    output = BytesIO()
+    _build(report_sections(document, scores, cu_range, head, tail, taxonomy, number_from), output)
+    return output.getvalue()
+
+
+def build_pdf_report(document, scores, output, workers=None):
+    workers = pdf_workers if workers is None else workers
+    n_cus = len(document.cu_blocks)
+    if workers > 1 and PdfWriter is not None and n_cus > pdf_chunk_cus:
+        return _build_parallel(document, scores, output, workers)
+    return _build(report_sections(document, scores), output)
+
+
+def _parallel_parts(document, scores):
+    # (document, scores, cu_range, head, tail, number_from) per part, holding only what that part
+    # renders: the head gets the profile and summary columns, each chunk its CUs with
+    # their matches, and the last chunk the keyword counts
+    n_cus = len(document.cu_blocks)
+    yield (
+        NossDocument(document.profile_data, [CompetencyUnit(cu.code, cu.title) for cu in document.cu_blocks]),
+        DocumentScore([CuScore({}, {}, s.totals) for s in scores.cu_scores], {}, scores.taxonomy),
+        range(0), True, False, 1,
+    )
+    for start in range(0, n_cus, pdf_chunk_cus):
+        stop = min(start + pdf_chunk_cus, n_cus)
+        last = stop == n_cus
+        yield (
+            NossDocument({}, document.cu_blocks[start:stop]),
+            DocumentScore(scores.cu_scores[start:stop], scores.keyword_counts if last else {}, scores.taxonomy),
+            None, False, last, start + 1,
+        )
+
+
+def _build_parallel(document, scores, output, workers):
+    # Profile + summary, then CU chunks (the last one carries the keyword summary),
+    # each rendered to its own PDF in a worker process and appended in order.
+    # At most `workers` parts are pickled and in flight at once.
+    taxonomy = taxonomy_of(scores)
+    writer = PdfWriter()
+    context = multiprocessing.get_context(pdf_start_method)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        running = deque()
+        for part in _parallel_parts(document, scores):
+            running.append(pool.submit(_build_part, *part, taxonomy))
+            if len(running) >= workers:
+                writer.append(BytesIO(running.popleft().result()))
+        while running:
+            writer.append(BytesIO(running.popleft().result()))
+    writer.write(output)
+    return output
@@ -0,0 +1,376 @@
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from http import HTTPStatus
+from urllib.parse import parse_qs, quote, urlsplit
+
+from analysis import analyze
+from cu_index import CuIndex
+from taxonomy import taxonomies
+
+MAX_HEADER_BYTES = 64 * 1024
+JOB_STATES = ("queued", "running", "done", "failed", "timeout")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class Job:
+    id: str
+    name: str
+    html: bytes
+    pdf: bool = True
+    taxonomy: str | None = None
+    status: str = "queued"
+    submitted: float = 0.0
+    started: float = 0.0
+    finished: float = 0.0
+    error: str = ""
+    result: dict | None = None
+    pdf_bytes: bytes = b""
+
+    def status_dict(self):
+        return {
+            "id": self.id, "name": self.name, "status": self.status, "error": self.error,
+            "submitted": self.submitted, "started": self.started or None, "finished": self.finished or None,
+            "pdf": bool(self.pdf_bytes),
+        }
+
+
+# === Worker Processes ===
+def result_payload(name, result):
+    # JSON-friendly view of an AnalysisResult (no spans, no PDF)
+    return {
+        "name": name,
+        "key": result.key,
+        "taxonomy": result.scores.taxonomy,
+        "profile": result.document.profile_data,
+        "cus": [
+            {
+                "position": i, "code": cu.code, "title": cu.title,
+                "totals": cu_score.totals, "scores": cu_score.scores,
+            }
+            for i, (cu, cu_score) in enumerate(zip(result.document.cu_blocks, result.scores.cu_scores), 1)
+        ],
+        "keyword_counts": {category: dict(counts) for category, counts in result.scores.keyword_counts.items()},
+    }
+
+
+def _worker_main(conn, index_path):
+    # One job at a time; the parent kills the process if a job overruns its timeout
+    index = CuIndex(index_path) if index_path else None
+    while True:
+        try:
+            name, html, pdf, taxonomy = conn.recv()
+        except EOFError:
+            return
+        try:
+            result = analyze(html, pdf=pdf, taxonomy=taxonomy)
+            if index is not None:
+                index.add(name, result)
+            conn.send(("done", result_payload(name, result), result.pdf))
+        except Exception as exc:
+            conn.send(("failed", f"{type(exc).__name__}: {exc}", b""))
+
+
+class _WorkerProcess:
+    def __init__(self, context, index_path):
+        self._context = context
+        self._index_path = index_path
+        self._start()
+
+    def _start(self):
+        self.conn, child = self._context.Pipe()
+        # Not daemonic: a job's parallel PDF build starts processes of its own. stop() kills
+        # and joins it, and it exits on EOF if the service dies without stopping it.
+        self.process = self._context.Process(target=_worker_main, args=(child, self._index_path))
+        self.process.start()
+        child.close()
+
+    def _exchange(self, job):
+        self.conn.send((job.name, job.html, job.pdf, job.taxonomy))
+        return self.conn.recv()
+
+    async def run(self, job, timeout):
+        loop = asyncio.get_running_loop()
+        if not self.process.is_alive():
+            # Died while idle (OOM kill, signal); the job has not been sent, so it gets a fresh one
+            self.restart()
+        try:
+            # The upload is written to the pipe off the event loop too
+            return await asyncio.wait_for(loop.run_in_executor(None, self._exchange, job), timeout)
+        except (asyncio.TimeoutError, EOFError, OSError):
+            # Overran or crashed: replace the process so the next job starts clean
+            self.restart()
+            raise
+
+    def restart(self):
+        self.stop()
+        self._start()
+
+    def stop(self):
+        self.conn.close()
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+
+
+# === Job Service ===
+class JobService:
+    def __init__(self, workers=None, queue_size=32, timeout=300.0, keep_jobs=256, index_path=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.keep_jobs = keep_jobs
+        self.index_path = index_path
+        self.jobs = OrderedDict()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self._processes = []
+        self._tasks = []
+
+    async def start(self):
+        context = multiprocessing.get_context("spawn")
+        for _ in range(self.workers):
+            worker = _WorkerProcess(context, self.index_path)
+            self._processes.append(worker)
+            self._tasks.append(asyncio.create_task(self._consume(worker)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for worker in self._processes:
+            worker.stop()
+
+    def submit(self, name, html, pdf=True, taxonomy=None):
+        # Raises asyncio.QueueFull when the service is saturated
+        job = Job(uuid.uuid4().hex, name, html, pdf, taxonomy, submitted=time.time())
+        self.queue.put_nowait(job)
+        self.jobs[job.id] = job
+        self._forget_old_jobs()
+        return job
+
+    def _forget_old_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.status not in ("queued", "running")]
+        for job_id in finished[:max(0, len(self.jobs) - self.keep_jobs)]:
+            del self.jobs[job_id]
+
+    async def _consume(self, worker):
+        while True:
+            job = await self.queue.get()
+            job.status, job.started = "running", time.time()
+            try:
+                job.status, payload, job.pdf_bytes = await worker.run(job, self.timeout)
+                if job.status == "done":
+                    job.result = payload
+                else:
+                    job.error = payload
+            except asyncio.TimeoutError:
+                job.status, job.error = "timeout", f"Job exceeded {self.timeout:g}s"
+            except Exception as exc:
+                job.status, job.error = "failed", f"Worker crashed: {type(exc).__name__}: {exc}"
+            finally:
+                job.html = b""
+                job.finished = time.time()
+                self.queue.task_done()
+            logger.info("Job %s (%s) %s in %.2fs", job.id, job.name, job.status, job.finished - job.started)
+
+    def stats(self):
+        counts = {state: 0 for state in JOB_STATES}
+        for job in self.jobs.values():
+            counts[job.status] += 1
+        return {"workers": self.workers, "queued": self.queue.qsize(), "queue_size": self.queue.maxsize, "jobs": counts}
+
+
+# === HTTP ===
+class HttpError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class Request:
+    def __init__(self, method, target, headers, body):
+        self.method = method
+        parts = urlsplit(target)
+        self.path = parts.path.rstrip("/") or "/"
+        self.query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        self.headers = headers
+        self.body = body
+
+
+async def read_request(reader, max_body):
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.LimitOverrunError:
+        raise HttpError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Headers too large")
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, _ = lines[0].split(" ", 2)
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            key, value = line.split(":", 1)
+            headers[key.strip().lower()] = value.strip()
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise HttpError(HTTPStatus.LENGTH_REQUIRED, "Chunked uploads are not supported; send Content-Length")
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        length = -1
+    if length < 0:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+    if length > max_body:
+        raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Upload larger than {max_body} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return Request(method.upper(), target, headers, body)
+
+
+async def write_response(writer, status, body=b"", content_type="application/json", headers=None):
+    status = HTTPStatus(status)
+    if isinstance(body, (dict, list)):
+        body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+    lines = [
+        f"HTTP/1.1 {status.value} {status.phrase}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(body)}",
+        "Connection: close",
+        *(f"{k}: {v}" for k, v in (headers or {}).items()),
+    ]
+    if any("\r" in line or "\n" in line for line in lines):
+        raise ValueError("Response header contains a line break")
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+
+
+def content_disposition(filename):
+    # Client-supplied name: an ASCII fallback without quotes, backslashes or control
+    # characters, plus the exact name as RFC 5987 UTF-8 for clients that support it
+    fallback = "".join(
+        "_" if ord(c) > 0x7e else c for c in filename if ord(c) >= 0x20 and c not in '"\\'
+    )
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+class JobServer:
+    def __init__(self, service, max_body=50 * 1024 * 1024, read_timeout=60.0):
+        self.service = service
+        self.max_body = max_body
+        self.read_timeout = read_timeout
+
+    async def handle(self, reader, writer):
+        try:
+            try:
+                request = await asyncio.wait_for(read_request(reader, self.max_body), self.read_timeout)
+                status, body, content_type, headers = self.route(request)
+            except HttpError as exc:
+                status, body, content_type, headers = exc.status, {"error": str(exc)}, "application/json", exc.headers
+            except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                return
+            except Exception:
+                logger.exception("Request failed")
+                status, body, content_type, headers = 500, {"error": "Internal error"}, "application/json", {}
+            try:
+                await write_response(writer, status, body, content_type, headers)
+            except ConnectionError:
+                raise
+            except Exception:
+                # Nothing has been sent yet: the response is built in full before writing
+                logger.exception("Could not write response")
+                await write_response(writer, 500, {"error": "Internal error"})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def route(self, request):
+        parts = request.path.strip("/").split("/")
+        if request.path == "/health" and request.method == "GET":
+            return 200, self.service.stats(), "application/json", {}
+        if parts[0] == "jobs" and len(parts) == 1:
+            if request.method != "POST":
+                raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST to submit a job", {"Allow": "POST"})
+            return self.submit(request)
+        if parts[0] == "jobs" and len(parts) in (2, 3) and request.method == "GET":
+            job = self.service.jobs.get(parts[1])
+            if job is None:
+                raise HttpError(HTTPStatus.NOT_FOUND, f"No job {parts[1]}")
+            view = parts[2] if len(parts) == 3 else "status"
+            if view == "status":
+                return 200, job.status_dict(), "application/json", {}
+            if view in ("result", "pdf") and job.status in ("queued", "running"):
+                raise HttpError(HTTPStatus.CONFLICT, f"Job is {job.status}", {"Retry-After": "1"})
+            if view == "result":
+                if job.result is None:
+                    raise HttpError(HTTPStatus.UNPROCESSABLE_ENTITY, job.error or f"Job {job.status}")
+                return 200, job.result, "application/json", {}
+            if view == "pdf":
+                if not job.pdf_bytes:
+                    raise HttpError(HTTPStatus.NOT_FOUND, job.error or "No PDF for this job")
+                filename = f"{os.path.splitext(job.name)[0] or job.id}.pdf"
+                return 200, job.pdf_bytes, "application/pdf", {"Content-Disposition": content_disposition(filename)}
+        raise HttpError(HTTPStatus.NOT_FOUND, f"No route for {request.method} {request.path}")
+
+    def submit(self, request):
+        if not request.body:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "POST the NOSS HTML file as the request body")
+        name = request.query.get("name") or request.headers.get("x-filename") or "upload.html"
+        pdf = request.query.get("pdf", "1") not in ("0", "false", "no")
+        taxonomy = request.query.get("taxonomy")
+        if taxonomy is not None and taxonomy not in taxonomies.names():
+            # Only taxonomies from the configured directory, never arbitrary server paths
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Unknown taxonomy {taxonomy!r}")
+        try:
+            job = self.service.submit(name, request.body, pdf, taxonomy)
+        except asyncio.QueueFull:
+            # Backpressure: clients retry instead of piling work onto the queue
+            raise HttpError(HTTPStatus.SERVICE_UNAVAILABLE, "Job queue is full", {"Retry-After": "5"})
+        status = job.status_dict()
+        status["links"] = {"status": f"/jobs/{job.id}", "result": f"/jobs/{job.id}/result", "pdf": f"/jobs/{job.id}/pdf"}
+        return 202, status, "application/json", {"Location": f"/jobs/{job.id}"}
+
+
+async def serve(host, port, service, max_body):
+    await service.start()
+    server = await asyncio.start_server(JobServer(service, max_body).handle, host, port, limit=MAX_HEADER_BYTES)
+    logger.info("Serving on http://%s:%s with %d workers", host, port, service.workers)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP job service for NOSS analysis (parse, score, PDF).")
+    parser.add_argument("--host", default="127.0.0.1", help="bind address (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=8765, help="port (default: %(default)s)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--queue-size", type=int, default=32, help="queued jobs before 503 (default: %(default)s)")
+    parser.add_argument("--timeout", type=float, default=300.0, help="seconds per job (default: %(default)s)")
+    parser.add_argument("--keep-jobs", type=int, default=256, help="finished jobs kept for polling (default: %(default)s)")
+    parser.add_argument("--max-upload-mb", type=float, default=50.0, help="largest accepted upload (default: %(default)s)")
+    parser.add_argument("--index", metavar="PATH", help="also add every analyzed file to this search index")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    service = JobService(args.workers, args.queue_size, args.timeout, args.keep_jobs, args.index)
+    try:
+        asyncio.run(serve(args.host, args.port, service, int(args.max_upload_mb * 1024 * 1024)))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
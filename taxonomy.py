@@ -0,0 +1,186 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from matcher import Highlighter, KeywordMatcher
+
+try:
+    import yaml
+except ImportError:  # optional: only needed for .yaml/.yml taxonomy files
+    yaml = None
+
+TAXONOMY_SUFFIXES = (".json", ".yaml", ".yml")
+# CU fields every taxonomy weights; the reports show one score column per category for each
+SCORED_FIELDS = ["CU TITLE", "CU DESCRIPTOR", "WORK ACTIVITY", "PERFORMANCE CRITERIA"]
+
+# The PDF report fits this many 1.25 cm score columns beside its label and text columns
+MAX_CATEGORIES = 6
+
+# Highlight templates per output format; {color} comes from the category
+MARK_FORMATS = {
+    "html": "<mark style='background-color:{color}'>{{}}</mark>",
+    "pdf": '<font backcolor="{color}">{{}}</font>',
+}
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True, frozen=True)
+class Category:
+    code: str
+    title: str
+    color: str
+    keywords: tuple
+
+
+class Taxonomy:
+    # Categories + field weights, with the matcher and highlighter compiled once
+    def __init__(self, name, categories, weights, source=""):
+        self.name = name
+        self.categories = categories
+        self.weights = weights
+        self.source = source
+        canonical = {
+            "name": name,
+            "weights": weights,
+            "categories": [[c.code, c.title, c.color, list(c.keywords)] for c in categories.values()],
+        }
+        # Part of every cache key: changes whenever anything that affects scores or output does
+        self.version = hashlib.sha256(
+            json.dumps(canonical, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+        self.matcher = KeywordMatcher({code: c.keywords for code, c in categories.items()})
+        self.highlighter = Highlighter(self.matcher, {
+            fmt: {code: template.format(color=c.color) for code, c in categories.items()}
+            for fmt, template in MARK_FORMATS.items()
+        })
+
+    @property
+    def codes(self):
+        return list(self.categories)
+
+    def __reduce__(self):
+        # Pickled as its definition (e.g. for PDF worker processes); the matcher is recompiled on load
+        return Taxonomy, (self.name, self.categories, self.weights, self.source)
+
+    def __repr__(self):
+        return f"Taxonomy({self.name!r}, version={self.version!r}, categories={self.codes})"
+
+
+def taxonomy_from_dict(data, name="", source=""):
+    name = data.get("name") or name
+    weights = data.get("weights")
+    categories = data.get("categories")
+    if not isinstance(weights, dict) or sorted(weights) != sorted(SCORED_FIELDS):
+        raise ValueError(f"Taxonomy {name!r}: 'weights' must give an integer weight for each of {SCORED_FIELDS}")
+    if not isinstance(categories, dict) or not categories:
+        raise ValueError(f"Taxonomy {name!r}: 'categories' must map category codes to keyword lists")
+    if len(categories) > MAX_CATEGORIES:
+        raise ValueError(
+            f"Taxonomy {name!r} has {len(categories)} categories; the PDF report lays out at most {MAX_CATEGORIES}"
+        )
+    built = {}
+    for code, spec in categories.items():
+        if not isinstance(code, str) or not code.strip():
+            # e.g. an unquoted YAML key such as `1:`; codes name columns and widget keys
+            raise ValueError(f"Taxonomy {name!r}: category code {code!r} must be non-empty text (quote it in YAML)")
+        if isinstance(spec, list):
+            spec = {"keywords": spec}
+        keywords = spec.get("keywords") or []
+        if not all(isinstance(kw, str) and kw.strip() for kw in keywords):
+            raise ValueError(f"Taxonomy {name!r}: category {code!r} has empty or non-text keywords")
+        built[code] = Category(
+            code, spec.get("title", code), spec.get("color", "#ffff99"),
+            tuple(kw.strip().lower() for kw in keywords),
+        )
+    return Taxonomy(name, built, {str(k): int(v) for k, v in weights.items()}, source)
+
+
+def load_taxonomy(path):
+    path = Path(path)
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() == ".json":
+        data = json.loads(text)
+    elif yaml is None:
+        raise ValueError(f"Install PyYAML to load {path}")
+    else:
+        data = yaml.safe_load(text)
+    return taxonomy_from_dict(data or {}, path.stem, str(path))
+
+
+class TaxonomyRegistry:
+    # Taxonomy files in a directory, reloaded when their mtime or size changes.
+    # Reloads that produce an already-seen version reuse its compiled matcher.
+    def __init__(self, directory, default_name="default"):
+        self.directory = directory
+        self.default_name = default_name
+        self._files = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def names(self):
+        try:
+            entries = sorted(os.listdir(self.directory))
+        except FileNotFoundError:
+            return []
+        return list(dict.fromkeys(
+            os.path.splitext(e)[0] for e in entries if os.path.splitext(e)[1].lower() in TAXONOMY_SUFFIXES
+        ))
+
+    def _path(self, name):
+        if os.path.splitext(name)[1].lower() in TAXONOMY_SUFFIXES and os.path.isfile(name):
+            return name
+        for suffix in TAXONOMY_SUFFIXES:
+            path = os.path.join(self.directory, name + suffix)
+            if os.path.isfile(path):
+                return path
+        raise KeyError(f"No taxonomy named {name!r} in {self.directory}")
+
+    def get(self, name=None):
+        # name: a taxonomy name in the directory, a path to a taxonomy file, or None for the default
+        if isinstance(name, Taxonomy):
+            return name
+        path = self._path(name or self.default_name)
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._files.get(path)
+            if entry is not None and entry[0] == stamp:
+                return entry[1]
+            try:
+                taxonomy = load_taxonomy(path)
+            except Exception:
+                if entry is None:
+                    raise
+                # Keep serving the last good version (once per change) while the file is being edited
+                logger.warning("Could not reload taxonomy %s; keeping version %s", path, entry[1].version, exc_info=True)
+                self._files[path] = (stamp, entry[1])
+                return entry[1]
+            taxonomy = self._versions.setdefault(taxonomy.version, taxonomy)
+            if entry is not None and entry[1] is not taxonomy:
+                logger.info("Reloaded taxonomy %s: version %s -> %s", path, entry[1].version, taxonomy.version)
+            self._files[path] = (stamp, taxonomy)
+            return taxonomy
+
+    def by_version(self, version):
+        with self._lock:
+            return self._versions.get(version)
+
+
+taxonomies = TaxonomyRegistry(
+    os.environ.get("CU_ANALYZER_TAXONOMIES") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "taxonomies"),
+    os.environ.get("CU_ANALYZER_TAXONOMY", "default"),
+)
+
+
+def taxonomy_of(scores):
+    # The taxonomy a DocumentScore was computed with. Never falls back to another
+    # taxonomy: its categories, colours and titles would not match the scores.
+    taxonomy = taxonomies.by_version(scores.taxonomy)
+    if taxonomy is None:
+        raise KeyError(f"Scores were computed with taxonomy version {scores.taxonomy!r}, which is not loaded")
+    return taxonomy
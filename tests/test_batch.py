@@ -0,0 +1,30 @@
+import multiprocessing
+import os
+
+import pytest
+
+import batch
+from benchmarks.synthetic import generate_noss
+
+process_file = batch.process_file
+
+
+def crash_on_d3(name, *args):
+    # Dies the way an OOM-killed or natively crashed worker does
+    if name == "d3.html":
+        os._exit(1)
+    return process_file(name, *args)
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="patches process_file in forked workers")
+def test_crashed_worker_fails_only_its_own_file(tmp_path, monkeypatch):
+    source = tmp_path / "noss"
+    source.mkdir()
+    for i in range(8):
+        (source / f"d{i}.html").write_text(generate_noss(n_cus=2, seed=i), encoding="utf-8")
+    monkeypatch.setattr(batch, "process_file", crash_on_d3)
+    results = batch.run_batch(source, tmp_path / "out", workers=2, pdf=False)
+    errors = {r.name: r.error for r in results if r.error}
+    assert list(errors) == ["d3.html"]
+    assert errors["d3.html"].startswith("BrokenProcessPool")
+    assert all(r.rows for r in results if r.name != "d3.html")
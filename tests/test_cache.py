@@ -0,0 +1,25 @@
+import threading
+
+import pytest
+
+from cache import ResultCache
+
+
+def test_failed_compute_releases_its_key_lock(tmp_path):
+    cache = ResultCache(cache_dir=str(tmp_path))
+
+    def fail():
+        raise ValueError("bad upload")
+
+    with pytest.raises(ValueError):
+        cache.get_or_compute("key", fail)
+    assert cache._key_locks == {}
+    assert cache.get_or_compute("key", lambda: "value") == "value"
+
+
+def test_unpicklable_result_stays_in_memory_only(tmp_path):
+    cache = ResultCache(cache_dir=str(tmp_path))
+    value = {"lock": threading.Lock()}
+    assert cache.get_or_compute("key", lambda: value) is value
+    assert cache.get("key") is value
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,40 @@
+import json
+
+from analysis import analyze
+from benchmarks.synthetic import generate_noss
+from cu_index import CuIndex
+from taxonomy import SCORED_FIELDS
+
+
+def analyzed(n_cus, seed):
+    return analyze(generate_noss(n_cus=n_cus, seed=seed).encode("utf-8"), cache=None, pdf=False)
+
+
+def test_same_name_different_content_coexist(tmp_path):
+    index = CuIndex(str(tmp_path / "index.sqlite3"))
+    first, second = analyzed(3, 1), analyzed(4, 2)
+    assert index.add("NOSS.html", first)
+    assert index.add("NOSS.html", second)
+    assert not index.add("NOSS.html", first)
+    assert index.stats() == {"documents": 2, "cus": 7}
+    index.remove("NOSS.html")
+    assert index.stats() == {"documents": 0, "cus": 0}
+
+
+def test_documents_are_searched_within_their_taxonomy(tmp_path):
+    path = tmp_path / "safety.json"
+    path.write_text(json.dumps({
+        "name": "safety",
+        "weights": {field: 25 for field in SCORED_FIELDS},
+        "categories": {"SAF": ["operator", "safety"]},
+    }), encoding="utf-8")
+    html = generate_noss(n_cus=3, seed=1).encode("utf-8")
+    index = CuIndex(str(tmp_path / "index.sqlite3"))
+    assert index.add("NOSS.html", analyze(html, cache=None, pdf=False))
+    assert index.add("NOSS.html", analyze(html, cache=None, pdf=False, taxonomy=str(path)))
+    assert index.taxonomy_names() == ["default", "safety"]
+    assert index.categories("safety") == ["SAF"]
+    assert index.stats("safety") == {"documents": 1, "cus": 3}
+    hits = index.search(min_scores={"SAF": 1}, taxonomy="safety")
+    assert len(hits) == 3 and all(set(hit.scores) == {"SAF"} for hit in hits)
+    assert index.search(min_scores={"SAF": 1}, taxonomy="default") == []
@@ -0,0 +1,108 @@
+import random
+import re
+
+import pytest
+
+from taxonomy import SCORED_FIELDS, taxonomies, taxonomy_from_dict
+
+GT = ["data management", "data", "clean energy", "energy"]
+IR = ["management system", "data", "system", "iot"]
+
+
+# === The original app's highlighting, kept as the reference ===
+def original_highlight(text, gt_keywords, ir_keywords):
+    def replacer(match):
+        word = match.group(0)
+        lw = word.lower()
+        if lw in gt_keywords:
+            return f"<mark style='background-color:#ccffcc'>{word}</mark>"
+        elif lw in ir_keywords:
+            return f"<mark style='background-color:#ffff99'>{word}</mark>"
+        return word
+
+    all_keywords = sorted(set(gt_keywords + ir_keywords), key=len, reverse=True)
+    pattern = re.compile(r'\b(' + '|'.join(re.escape(k) for k in all_keywords) + r')\b', re.IGNORECASE)
+    return pattern.sub(replacer, text)
+
+
+# The PDF variant with the word boundaries it was missing, which both outputs now share
+def original_highlight_keywords(text, gt_keywords, ir_keywords):
+    all_keywords = sorted(set(gt_keywords + ir_keywords), key=len, reverse=True)
+    def replacer(match):
+        word = match.group(0)
+        lw = word.lower()
+        if lw in gt_keywords:
+            return f'<font backcolor="#ccffcc">{word}</font>'
+        elif lw in ir_keywords:
+            return f'<font backcolor="#ffff99">{word}</font>'
+        return word
+    pattern = re.compile(r'\b(' + '|'.join(re.escape(k) for k in all_keywords) + r')\b', re.IGNORECASE)
+    return pattern.sub(replacer, text)
+
+
+def overlapping_taxonomy():
+    return taxonomy_from_dict({
+        "name": "overlap",
+        "weights": {field: 25 for field in SCORED_FIELDS},
+        "categories": {
+            "GT": {"color": "#ccffcc", "keywords": GT},
+            "IR": {"color": "#ffff99", "keywords": IR},
+        },
+    })
+
+
+def texts(seed, n=500):
+    words = [
+        "data", "Data", "DATA", "management", "Management", "system", "systems", "database",
+        "metadata", "clean", "energy", "IoT", "iot-enabled", "the", "a", "-", " - ", ",", ".", "(", ")",
+    ]
+    rng = random.Random(seed)
+    for _ in range(n):
+        yield "".join(rng.choice(words) + rng.choice(["", " ", " ", "  "]) for _ in range(rng.randint(0, 20)))
+
+
+FIXED = [
+    "",
+    "data management system",
+    "Data Management System - data - management system",
+    "data managements system",
+    "metadata management system",
+    "datadata management systemsystem",
+    " - clean energy -  - energy systems - ",
+]
+
+
+def assert_same_as_original(taxonomy, text, gt, ir):
+    highlighter, matcher = taxonomy.highlighter, taxonomy.matcher
+    assert highlighter.render(text, "html") == original_highlight(text, gt, ir)
+    assert highlighter.render(text, "pdf") == original_highlight_keywords(text, gt, ir)
+    assert highlighter.items(text, "html") == [
+        original_highlight(x.strip(), gt, ir) for x in text.split(" - ") if x.strip()
+    ]
+
+    match, lowered = matcher.scan(text), text.lower()
+    for code, keywords in (("GT", gt), ("IR", ir)):
+        expected = {kw: lowered.count(kw) for kw in keywords if lowered.count(kw)}
+        assert dict(match.counts.get(code, {})) == expected
+        assert (code in match.hits) == any(kw in lowered for kw in keywords)
+
+
+@pytest.mark.parametrize("text", FIXED)
+def test_overlapping_keywords_match_original(text):
+    assert_same_as_original(overlapping_taxonomy(), text, GT, IR)
+
+
+def test_random_text_matches_original():
+    taxonomy = overlapping_taxonomy()
+    for text in texts(seed=1):
+        assert_same_as_original(taxonomy, text, GT, IR)
+
+
+def test_default_taxonomy_matches_original():
+    taxonomy = taxonomies.get()
+    gt, ir = (list(taxonomy.categories[code].keywords) for code in ("GT", "IR"))
+    rng = random.Random(2)
+    vocabulary = gt + ir + ["the", "and", "-", " - ", "systems", "data"]
+    for _ in range(200):
+        text = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(0, 30)))
+        assert_same_as_original(taxonomy, text, gt, ir)
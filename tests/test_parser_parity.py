@@ -0,0 +1,127 @@
+import pytest
+
+import noss
+from benchmarks.synthetic import generate_noss
+from noss import parse_noss
+
+PROFILE = """
+<table class="table table-bordered">
+<tr><td>NOSS CODE</td><td>MC-030-3:2024</td></tr>
+<tr><td>NOSS TITLE</td><td>PLANT OPERATIONS</td></tr>
+</table>
+"""
+
+
+def page(*tables):
+    return "<html><body>" + PROFILE + "".join(tables) + "</body></html>"
+
+
+def cu_table(code="C01", title="Safety", descriptor="Apply safety procedures", attrs='class="table"'):
+    return f"""
+    <table {attrs}>
+    <tr><td>CU CODE</td><td>{code}</td></tr>
+    <tr><td>CU TITLE</td><td>{title}</td></tr>
+    <tr><td>CU DESCRIPTOR</td><td>{descriptor}</td></tr>
+    </table>
+    """
+
+
+def wa_table(*rows, attrs='class="table"'):
+    cells = "".join(f"<tr><td>{wa}</td><td>{pc}</td></tr>" for wa, pc in rows)
+    return f"<table {attrs}><tr><th>WORK ACTIVITIES</th><th>PERFORMANCE CRITERIA</th></tr>{cells}</table>"
+
+
+def assert_parity(html):
+    soup, stream = parse_noss(html, "soup"), parse_noss(html, "stream")
+    assert stream.profile_data == soup.profile_data
+    assert stream.cu_blocks == soup.cu_blocks
+    return soup
+
+
+@pytest.mark.parametrize("n_cus", [0, 1, 7, 60])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_synthetic_documents(n_cus, seed):
+    document = assert_parity(generate_noss(n_cus=n_cus, seed=seed))
+    assert len(document.cu_blocks) == n_cus
+
+
+def test_synthetic_document_larger_than_one_chunk():
+    html = generate_noss(n_cus=150, words=40, seed=5)
+    assert len(html) > 1 << 16
+    assert_parity(html)
+
+
+def test_nested_tables():
+    nested = '<table class="table"><tr><td>inner</td><td>cell</td></tr></table>'
+    assert_parity(page(
+        cu_table(descriptor=f"Outer text {nested} after"),
+        wa_table(("Prepare tools", f"<table><tr><td>Tools</td><td>listed</td></tr></table> checked")),
+    ))
+
+
+def test_implicit_closes():
+    assert_parity(page(
+        """<table class="table">
+        <tr><td>CU CODE<td>C02
+        <tr><td>CU TITLE<td>Inspection
+        <tr><td>CU DESCRIPTOR<td>Inspect the plant
+        </table>""",
+        """<table class="table"><tr><th>WORK ACTIVITIES<th>PERFORMANCE CRITERIA
+        <tr><td>Check valves<td>Valves checked
+        <tr><td>Record readings<td>Readings recorded</table>""",
+    ))
+
+
+def test_unclosed_document():
+    assert_parity(page(cu_table(), wa_table(("Check", "Checked")))[:-40])
+
+
+@pytest.mark.parametrize("text", [
+    "Safety&nbsp;first",
+    "&copy 2024 and &copy; 2024",
+    "&#65;&#x42; grade",
+    "AT&T &amp; R&D &unknown; &",
+    "&lt;b&gt;not bold&lt;/b&gt;",
+])
+def test_entities(text):
+    assert_parity(page(cu_table(title=text, descriptor=f"<p>{text}</p>"), wa_table((text, text))))
+
+
+def test_script_style_and_comments_in_cells():
+    assert_parity(page(
+        cu_table(title="Safety<!-- hidden --> rules", descriptor="<script>var x = '<td>';</script>Apply<style>p {}</style>"),
+        wa_table(("Check <!-- note -->valves", "<script>alert(1)</script>Valves checked")),
+    ))
+
+
+def test_uppercase_tags_and_class():
+    assert_parity(page(
+        cu_table(attrs='CLASS="Table table"'),
+        wa_table(("Check", "Checked"), attrs='CLASS="Table table"').upper(),
+    ))
+
+
+def test_tables_without_table_class_are_ignored():
+    document = assert_parity(page(cu_table(attrs='class="grid"'), cu_table(code="C03")))
+    assert [cu.code for cu in document.cu_blocks] == ["C03"]
+
+
+def test_paragraph_whitespace():
+    assert_parity(page(
+        cu_table(descriptor="<p>  First   line  </p>\n\n  <p>\tSecond</p> <p> </p>"),
+        wa_table(("<p>Check</p>\n<p>valves</p>", "<ol>\n  <li>One</li>\n  <li> Two </li>\n</ol>"), ("<br>", "&nbsp;")),
+    ))
+
+
+def test_stream_failure_falls_back_to_soup(monkeypatch):
+    html = generate_noss(n_cus=3, seed=1)
+    expected = parse_noss(html, "soup")
+
+    def broken(html_content, chunk_size=1 << 16):
+        raise RuntimeError("parser bug")
+        yield
+
+    monkeypatch.setattr(noss, "_stream_tables", broken)
+    assert parse_noss(html, "stream") == expected
+    with pytest.raises(RuntimeError):
+        parse_noss(iter([html]), "stream")
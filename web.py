@@ -0,0 +1,139 @@
+import os
+
+import streamlit as st
+from diagnostics import stage
+from noss import PROFILE_FIELDS, parse_noss, score_document
+from taxonomy import taxonomies, taxonomy_of
+
+# Only the visible page of CU details is highlighted and sent to the browser
+PAGE_SIZES = [5, 10, 25, 50]
+default_page_size = int(os.environ.get("CU_ANALYZER_PAGE_SIZE", "10"))
+if default_page_size not in PAGE_SIZES:
+    PAGE_SIZES = sorted(PAGE_SIZES + [default_page_size])
+
+
+def highlight(match, start=0, end=None, taxonomy=None):
+    return taxonomies.get(taxonomy).highlighter.render(match, "html", start, end)
+
+
+def highlight_items(match, sep=" - ", taxonomy=None):
+    return taxonomies.get(taxonomy).highlighter.items(match, "html", sep)
+
+
+def process_html_and_display_web(html_content):
+    document = parse_noss(html_content)
+    display_web_report(document, score_document(document))
+
+
+def filter_cus(document, scores, code="", min_scores=None):
+    # (position, cu, cu_score) for CUs whose code contains `code` and meet every minimum total
+    code = code.strip().lower()
+    return [
+        (i, cu, cu_score)
+        for i, (cu, cu_score) in enumerate(zip(document.cu_blocks, scores.cu_scores), 1)
+        if code in cu.code.lower()
+        and all(cu_score.totals.get(cat, 0) >= minimum for cat, minimum in (min_scores or {}).items())
+    ]
+
+
+def page_count(n_items, page_size):
+    return max(1, -(-n_items // page_size))
+
+
+def cu_detail_html(cu, cu_score, taxonomy=None):
+    taxonomy = taxonomies.get(taxonomy)
+    matches, codes = cu_score.matches, taxonomy.codes
+
+    def cells(field, sep=""):
+        return sep.join(f"<td>{cu_score.scores[code][field]}%</td>" for code in codes)
+
+    def items(field):
+        return '<br>'.join(['• ' + x for x in highlight_items(matches[field], taxonomy=taxonomy)])
+
+    row_sep = "\n            "
+    return f"""
+        <table style='width:100%; border:1px solid #ccc; border-collapse:collapse;'>
+        <tr style='background:#eee'>
+            <th>Element</th><th>Content</th>{"".join(f"<th>{code} (%)</th>" for code in codes)}
+        </tr>
+        <tr><td><b>CU CODE</b></td><td>{cu.get("CU CODE", "")}</td>{"<td></td>" * len(codes)}</tr>
+        <tr><td><b>CU TITLE</b></td><td>{highlight(matches["CU TITLE"], taxonomy=taxonomy)}</td>{cells("CU TITLE")}</tr>
+        <tr><td><b>CU DESCRIPTOR</b></td><td>{highlight(matches["CU DESCRIPTOR"], taxonomy=taxonomy)}</td>{cells("CU DESCRIPTOR")}</tr>
+        <tr>
+            <td><b>WORK ACTIVITIES</b></td>
+            <td>{items("WORK ACTIVITY")}</td>
+            {cells("WORK ACTIVITY", row_sep)}
+        </tr>
+        <tr>
+            <td><b>PERFORMANCE CRITERIA</b></td>
+            <td>{items("PERFORMANCE CRITERIA")}</td>
+            {cells("PERFORMANCE CRITERIA", row_sep)}
+        </tr>
+        </table><br>
+        """
+
+
+def display_web_report(document, scores, diagnostics=None):
+    profile_data = document.profile_data
+
+    # === Display NOSS Profile ===
+    st.subheader("NOSS Profile")
+    for field in PROFILE_FIELDS:
+        st.markdown(f"**{field}**: {profile_data.get(field, '')}")
+
+    st.markdown("---")
+
+    display_cu_browser(document, scores, diagnostics)
+
+    # === Conditional Keyword Summary ===
+    for category in taxonomy_of(scores).categories.values():
+        matched = {kw: count for kw, count in scores.keyword_counts[category.code].items() if count > 0}
+        if matched:
+            st.subheader(f"Matched {category.title} Keywords")
+            for kw, count in sorted(matched.items(), key=lambda x: (-x[1], x[0])):
+                st.markdown(f"- **{kw}** ({count})")
+
+
+# Widget changes in here rerun only the CU browser, not the upload/analysis script
+@st.fragment
+def display_cu_browser(document, scores, diagnostics=None):
+    taxonomy = taxonomy_of(scores)
+    codes = taxonomy.codes
+
+    # === CU Filters ===
+    code_col, *score_cols, size_col = st.columns([3, *[1] * len(codes), 1])
+    code = code_col.text_input("Filter by CU code", key="cu_filter_code")
+    min_scores = {
+        c: col.number_input(f"Min {c} (%)", min_value=0, max_value=100, step=5, key=f"cu_filter_{c.lower()}")
+        for c, col in zip(codes, score_cols)
+    }
+    page_size = size_col.selectbox(
+        "CUs per page", PAGE_SIZES, index=PAGE_SIZES.index(default_page_size), key="cu_page_size"
+    )
+    selected = filter_cus(document, scores, code, min_scores)
+
+    # === CU Summary Table ===
+    st.subheader("Summary of CU Keyword Match Scores")
+    st.caption(f"{len(selected)} of {len(document.cu_blocks)} CUs match the filters.")
+    with stage(diagnostics, "summary"):
+        st.dataframe(
+            {
+                "#": [i for i, _, _ in selected],
+                "CU CODE": [cu.get("CU CODE", "") for _, cu, _ in selected],
+                "CU TITLE": [cu.get("CU TITLE", "") for _, cu, _ in selected],
+                **{f"{c} Total (%)": [cu_score.totals[c] for _, _, cu_score in selected] for c in codes},
+            },
+            width="stretch", hide_index=True,
+        )
+
+    # === CU Details ===
+    st.subheader("Detailed CU Content")
+    pages = page_count(len(selected), page_size)
+    # Keyed by page count so a filter that shrinks the result starts again at page 1
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f"cu_page_{pages}")
+    for i, cu, cu_score in selected[(page - 1) * page_size:page * page_size]:
+        st.markdown(f"### CU #{i}")
+        with stage(diagnostics, "highlight"):
+            table_html = cu_detail_html(cu, cu_score, taxonomy)
+        with stage(diagnostics, "markdown"):
+            st.markdown(table_html, unsafe_allow_html=True)